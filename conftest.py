@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def thumbnails_inline(settings):
+    """Миниатюры готовятся в потоке теста: поток пула дописывал бы их
+    во временный MEDIA_ROOT, пока тест его удаляет."""
+    settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,85 @@
+from django.core.files.storage import default_storage
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def _same(value):
+    return value
+
+
+def media_url(name):
+    return default_storage.url(name) if name else None
+
+
+class ValuesSerializer:
+    """Сериализатор строк ``QuerySet.values()``: объекты моделей
+    не создаются, связанные поля читаются тем же запросом через JOIN.
+
+    ``fields`` сопоставляет имя поля в ответе пути ORM, ``transforms`` -
+    функции, которые приводят значение к виду для JSON.
+    """
+    fields = {}
+    transforms = {}
+
+    def __init__(self, requested=None):
+        names = [name for name in (requested or '').split(',') if name]
+        unknown = set(names) - set(self.fields)
+        if unknown:
+            raise InvalidFields(sorted(unknown))
+        self.names = names or list(self.fields)
+
+    def lookups(self, *extra):
+        """Пути ORM для ``values()``; ``extra`` - поля ключа курсора,
+        которые нужны для пагинации, даже если их не просили."""
+        return list(dict.fromkeys(
+            [self.fields[name] for name in self.names] + list(extra)))
+
+    def row(self, values):
+        transforms = self.transforms
+        return {name: transforms.get(name, _same)(values[self.fields[name]])
+                for name in self.names}
+
+    def rows(self, values):
+        return [self.row(row) for row in values]
+
+
+class PostSerializer(ValuesSerializer):
+    fields = {
+        'id': 'pk',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'comment_count': 'comment_count',
+    }
+    transforms = {'image': media_url}
+
+
+class GroupSerializer(ValuesSerializer):
+    fields = {
+        'id': 'pk',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+        'post_count': 'post_count',
+    }
+
+
+class CommentSerializer(ValuesSerializer):
+    fields = {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }
+
+
+class FollowSerializer(ValuesSerializer):
+    fields = {
+        'id': 'pk',
+        'author': 'author__username',
+    }
@@ -0,0 +1,214 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiReadTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [Post.objects.create(author=cls.author, group=cls.group,
+                                         text=f'Тестовый пост {i}')
+                     for i in range(25)]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_query_budgets(self):
+        """Списки API читаются одним запросом values() на страницу"""
+        post_url = reverse('api:comments', kwargs={'post_id': self.post.pk})
+        budgets = (
+            ('api:posts', reverse('api:posts'), 1, self.client),
+            ('api:posts', reverse('api:posts') + '?group=test-slug', 1,
+             self.client),
+            ('api:comments', post_url, 2, self.client),
+            ('api:groups', reverse('api:groups'), 1, self.client),
+            # плюс сессия и пользователь
+            ('api:follows', reverse('api:follows'), 3,
+             self.authorized_client),
+        )
+        for view_name, url, budget, client in budgets:
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(view_name, url, budget,
+                                                  client)
+                self.assertEqual(response.status_code, 200)
+
+    def test_posts_are_serialized(self):
+        """Пост отдаётся с автором и группой по имени и адресу"""
+        response = self.client.get(
+            reverse('api:post', kwargs={'post_id': self.post.pk}))
+        data = response.json()
+        self.assertEqual(data['id'], self.post.pk)
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['author'], 'TestAuthor')
+        self.assertEqual(data['group'], 'test-slug')
+        self.assertIsNone(data['image'])
+        self.assertEqual(data['comment_count'], 3)
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только запрошенные поля"""
+        response = self.client.get(reverse('api:posts') + '?fields=id,text')
+        data = response.json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertIsNotNone(data['next'])
+
+    def test_unknown_fields(self):
+        """Неизвестное поле в ?fields= - ошибка 400"""
+        response = self.client.get(reverse('api:posts') + '?fields=id,oops')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('oops', response.json()['detail'])
+
+    def test_cursor_walks_all_posts(self):
+        """Курсор проходит все посты без пропусков и повторов"""
+        url = reverse('api:posts') + '?fields=id&limit=10'
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(row['id'] for row in data['results'])
+            url = (reverse('api:posts')
+                   + f'?fields=id&limit=10&cursor={data["next"]}'
+                   if data['next'] else None)
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_comments_in_order(self):
+        """Комментарии идут от старых к новым"""
+        response = self.client.get(
+            reverse('api:comments', kwargs={'post_id': self.post.pk}))
+        self.assertEqual([row['text'] for row in response.json()['results']],
+                         ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'])
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает 304"""
+        url = reverse('api:groups')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Group.objects.create(title='Другая', slug='other')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_found(self):
+        """Несуществующий объект - 404 в JSON"""
+        response = self.client.get(reverse('api:group',
+                                           kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
+
+
+class ApiWriteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def send(self, client, method, url, data=None):
+        return getattr(client, method)(url, json.dumps(data or {}),
+                                       content_type='application/json')
+
+    def test_anonymous_writes(self):
+        """Аноним не может писать через API"""
+        response = self.send(self.client, 'post', reverse('api:posts'),
+                             {'text': 'Новый пост'})
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Post.objects.filter(text='Новый пост').exists())
+
+    def test_create_post(self):
+        """Пост создаётся от имени пользователя, группа задаётся адресом"""
+        response = self.send(self.author_client, 'post', reverse('api:posts'),
+                             {'text': 'Новый пост', 'group': 'test-slug'})
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual((post.author, post.group),
+                         (self.author, self.group))
+
+    def test_invalid_post(self):
+        """Ошибки формы возвращаются с кодом 400"""
+        response = self.send(self.author_client, 'post', reverse('api:posts'),
+                             {'text': '', 'group': 'missing'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'text', 'group'})
+
+    def test_edit_and_delete_by_author_only(self):
+        """Менять и удалять пост может только автор"""
+        url = reverse('api:post', kwargs={'post_id': self.post.pk})
+        response = self.send(self.reader_client, 'patch', url,
+                             {'text': 'Чужая правка'})
+        self.assertEqual(response.status_code, 403)
+        response = self.send(self.reader_client, 'delete', url)
+        self.assertEqual(response.status_code, 403)
+        response = self.send(self.author_client, 'patch', url,
+                             {'group': 'test-slug'})
+        self.assertEqual(response.json()['group'], 'test-slug')
+        self.assertEqual(response.json()['text'], 'Пост')
+        response = self.send(self.author_client, 'delete', url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_comment(self):
+        """Комментарий добавляется к посту"""
+        response = self.send(
+            self.reader_client, 'post',
+            reverse('api:comments', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'Reader')
+        self.assertEqual(self.post.comments.count(), 1)
+
+    def test_follow_and_unfollow(self):
+        """Подписка создаётся один раз и снимается по имени автора"""
+        url = reverse('api:follows')
+        response = self.send(self.reader_client, 'post', url,
+                             {'author': 'TestAuthor'})
+        self.assertEqual(response.status_code, 201)
+        response = self.send(self.reader_client, 'post', url,
+                             {'author': 'TestAuthor'})
+        self.assertEqual(response.status_code, 200)
+        response = self.send(self.reader_client, 'post', url,
+                             {'author': 'Reader'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [row['author'] for row in
+             self.reader_client.get(url).json()['results']],
+            ['TestAuthor'])
+        response = self.send(
+            self.reader_client, 'delete',
+            reverse('api:unfollow', kwargs={'username': 'TestAuthor'}))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
@@ -0,0 +1,233 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_http_methods
+
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator, IdCursorPaginator
+
+from .serializers import (CommentSerializer, FollowSerializer,
+                          GroupSerializer, InvalidFields, PostSerializer)
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def etagged(request, response):
+    """Ставит ETag по содержимому ответа и отвечает 304, если клиент
+    прислал такой же в If-None-Match."""
+    etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def endpoint(*methods, login=False):
+    """Общая обёртка API: допустимые методы, 401 для анонимных записей
+    (и чтений при ``login``), 400 на неизвестные ``?fields=`` и ETag
+    для успешных GET."""
+    def decorator(view):
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if ((login or request.method != 'GET')
+                    and not request.user.is_authenticated):
+                return error(401, 'Требуется авторизация.')
+            try:
+                response = view(request, *args, **kwargs)
+            except InvalidFields as unknown:
+                return error(400, 'Неизвестные поля: '
+                                  f'{", ".join(unknown.args[0])}.')
+            if request.method == 'GET' and response.status_code == 200:
+                return etagged(request, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def payload(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        size = settings.API_PAGE_SIZE
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def listing(request, paginator, serializer):
+    """Страница списка: один запрос ``values()`` на ``limit + 1`` строк."""
+    page = paginator.get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': serializer.rows(page),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def detail(queryset, serializer, status=200):
+    values = queryset.values(*serializer.lookups()).first()
+    if values is None:
+        return error(404, 'Не найдено.')
+    return JsonResponse(serializer.row(values), status=status)
+
+
+def post_form(data, instance=None):
+    """PostForm по JSON: группа в API задаётся адресом, а не id."""
+    group = instance.group if instance else None
+    slug = data.get('group', group.slug if group else None)
+    fields = {
+        'text': data.get('text', instance.text if instance else None),
+        'group': None,
+    }
+    if slug:
+        # неизвестный адрес форма отклонит как неверный выбор
+        fields['group'] = (Group.objects.filter(slug=slug)
+                                        .values_list('pk', flat=True)
+                                        .first() or slug)
+    return PostForm(fields, instance=instance)
+
+
+@endpoint('GET', 'POST')
+def posts(request):
+    if request.method == 'POST':
+        return create_post(request)
+    serializer = PostSerializer(request.GET.get('fields'))
+    queryset = Post.objects.all()
+    if 'group' in request.GET:
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        queryset = queryset.filter(author__username=request.GET['author'])
+    return listing(request, CursorPaginator(
+        queryset.values(*serializer.lookups('pub_date', 'pk')),
+        page_size(request),
+    ), serializer)
+
+
+def create_post(request):
+    data = payload(request)
+    if data is None:
+        return error(400, 'Ожидается JSON-объект.')
+    form = post_form(data)
+    if not form.is_valid():
+        return JsonResponse(form.errors, status=400)
+    post = form.save(commit=False)
+    post.author = request.user
+    with transaction.atomic():
+        post.save()
+    return detail(Post.objects.filter(pk=post.pk), PostSerializer(),
+                  status=201)
+
+
+@endpoint('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    if request.method == 'GET':
+        return detail(Post.objects.filter(pk=post_id),
+                      PostSerializer(request.GET.get('fields')))
+    article = Post.objects.select_related('group').filter(pk=post_id).first()
+    if article is None:
+        return error(404, 'Не найдено.')
+    if article.author_id != request.user.pk:
+        return error(403, 'Изменять пост может только автор.')
+    if request.method == 'DELETE':
+        with transaction.atomic():
+            article.delete()
+        return HttpResponse(status=204)
+    data = payload(request)
+    if data is None:
+        return error(400, 'Ожидается JSON-объект.')
+    form = post_form(data, instance=article)
+    if not form.is_valid():
+        return JsonResponse(form.errors, status=400)
+    with transaction.atomic():
+        form.save()
+    return detail(Post.objects.filter(pk=post_id), PostSerializer())
+
+
+@endpoint('GET', 'POST')
+def comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Не найдено.')
+    if request.method == 'GET':
+        serializer = CommentSerializer(request.GET.get('fields'))
+        return listing(request, CursorPaginator(
+            Comment.objects.filter(post_id=post_id)
+                           .order_by('created', 'pk')
+                           .values(*serializer.lookups('created', 'pk')),
+            page_size(request), key=('created', 'pk'), descending=False,
+        ), serializer)
+    data = payload(request)
+    if data is None:
+        return error(400, 'Ожидается JSON-объект.')
+    form = CommentForm(data)
+    if not form.is_valid():
+        return JsonResponse(form.errors, status=400)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post_id = post_id
+    with transaction.atomic():
+        comment.save()
+    return detail(Comment.objects.filter(pk=comment.pk), CommentSerializer(),
+                  status=201)
+
+
+@endpoint('GET')
+def groups(request):
+    serializer = GroupSerializer(request.GET.get('fields'))
+    return listing(request, IdCursorPaginator(
+        Group.objects.order_by('pk').values(*serializer.lookups('pk')),
+        page_size(request), descending=False,
+    ), serializer)
+
+
+@endpoint('GET')
+def group(request, slug):
+    return detail(Group.objects.filter(slug=slug),
+                  GroupSerializer(request.GET.get('fields')))
+
+
+@endpoint('GET', 'POST', login=True)
+def follows(request):
+    if request.method == 'GET':
+        serializer = FollowSerializer(request.GET.get('fields'))
+        return listing(request, IdCursorPaginator(
+            Follow.objects.filter(user=request.user)
+                          .order_by('-pk')
+                          .values(*serializer.lookups('pk')),
+            page_size(request),
+        ), serializer)
+    data = payload(request)
+    if data is None:
+        return error(400, 'Ожидается JSON-объект.')
+    author = (User.objects.filter(username=data.get('author'))
+                          .only('pk').first())
+    if author is None:
+        return JsonResponse({'author': ['Нет такого автора.']}, status=400)
+    if author == request.user:
+        return JsonResponse({'author': ['Нельзя подписаться на себя.']},
+                            status=400)
+    follow, created = Follow.objects.get_or_create(user=request.user,
+                                                   author=author)
+    return detail(Follow.objects.filter(pk=follow.pk), FollowSerializer(),
+                  status=201 if created else 200)
+
+
+@endpoint('DELETE', login=True)
+def unfollow(request, username):
+    deleted, _ = Follow.objects.filter(user=request.user,
+                                       author__username=username).delete()
+    if not deleted:
+        return error(404, 'Не найдено.')
+    return HttpResponse(status=204)
@@ -0,0 +1,41 @@
+from django.db.backends.sqlite3 import base
+
+# значения по умолчанию; переопределяются в OPTIONS['pragmas']
+PRAGMAS = {
+    # читатели не ждут писателя, а писатель - читателей
+    'journal_mode': 'wal',
+    # в режиме WAL fsync нужен только при контрольной точке
+    'synchronous': 'normal',
+    # ждать освобождения блокировки вместо немедленной ошибки, мс
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # отрицательное значение - в КиБ
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Бэкенд SQLite, настроенный для нескольких процессов-воркеров.
+
+    Каждое новое соединение получает PRAGMAS, а транзакции начинаются
+    с BEGIN IMMEDIATE: транзакция, которая сначала читает, а потом пишет,
+    иначе не может дождаться блокировки записи и сразу получает
+    «database is locked».
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS,
+                   **self.settings_dict['OPTIONS'].get('pragmas', {})}
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,219 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# не чаще, чем раз в столько секунд, обновляем время обращения к ключу
+ACCESS_RESOLUTION = 1.0
+# ограничение SQLite на число параметров запроса
+MAX_PARAMS = 900
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов одного хоста.
+
+    Файл открывается в режиме WAL и читается через mmap, так что читатели
+    не блокируют друг друга. При переполнении вытесняются записи, к которым
+    дольше всего не обращались (LRU).
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._mmap_size = int(options.get('MMAP_SIZE', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # после fork соединение родителя использовать нельзя
+            local.conn = self._connect()
+            local.pid = os.getpid()
+        return local.conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self._path, timeout=self._busy_timeout,
+                               isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA mmap_size={self._mmap_size}')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+            'expires REAL, accessed REAL NOT NULL) WITHOUT ROWID')
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _expired(self, expires, now):
+        return expires is not None and expires <= now
+
+    def _written(self, db):
+        self._writes += 1
+        if self._writes % self._cull_every == 0:
+            self._cull(db)
+
+    def _cull(self, db):
+        now = time.time()
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        db.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        db = self._db
+        row = db.execute('SELECT value, expires, accessed FROM cache '
+                         'WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        now = time.time()
+        if self._expired(expires, now):
+            db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?',
+                       (key, now))
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            db.execute('UPDATE cache SET accessed = ? WHERE key = ?',
+                       (now, key))
+        return pickle.loads(value)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        touched = []
+        now = time.time()
+        made = list(names)
+        db = self._db
+        for start in range(0, len(made), MAX_PARAMS):
+            chunk = made[start:start + MAX_PARAMS]
+            rows = db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk)
+            for key, value, expires, accessed in rows:
+                if self._expired(expires, now):
+                    continue
+                found[names[key]] = pickle.loads(value)
+                if now - accessed > ACCESS_RESOLUTION:
+                    touched.append(key)
+        # как в get(): прочитанные ключи не должны вытесняться первыми
+        for start in range(0, len(touched), MAX_PARAMS):
+            chunk = touched[start:start + MAX_PARAMS]
+            db.execute('UPDATE cache SET accessed = ? WHERE key IN '
+                       f'({", ".join("?" * len(chunk))})', [now, *chunk])
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                       (key, self._dumps(value),
+                        self.get_backend_timeout(timeout), time.time()))
+            self._written(db)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [(self._key(key, version), self._dumps(value), expires, now)
+                for key, value in data.items()]
+        with self._transaction() as db:
+            db.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                           rows)
+            self._written(db)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('DELETE FROM cache WHERE key = ? AND expires <= ?',
+                       (key, now))
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (key, self._dumps(value), self.get_backend_timeout(timeout),
+                 now)).rowcount == 1
+            if added:
+                self._written(db)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute('SELECT value, expires FROM cache WHERE key = ?',
+                             (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute('UPDATE cache SET value = ?, accessed = ? '
+                       'WHERE key = ?', (self._dumps(value), now, key))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            return db.execute(
+                'UPDATE cache SET expires = ?, accessed = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now),
+            ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self._db.execute('DELETE FROM cache WHERE key = ?',
+                         (self._key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._transaction() as db:
+            for start in range(0, len(keys), MAX_PARAMS):
+                chunk = keys[start:start + MAX_PARAMS]
+                db.execute('DELETE FROM cache WHERE key IN '
+                           f'({", ".join("?" * len(chunk))})', chunk)
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
@@ -0,0 +1,65 @@
+import os
+import random
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+VALUE = 'x' * 1024
+
+
+def make_cache(name, location):
+    params = dict(settings.CACHE_BACKENDS[name])
+    backend = import_string(params.pop('BACKEND'))
+    params.pop('LOCATION', None)
+    return backend(location, params)
+
+
+def run_worker(name, location, keys, operations, seed):
+    cache = make_cache(name, location)
+    rnd = random.Random(seed)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        # перекос к «горячим» ключам, как у первых страниц лент
+        key = f'bench:{int(keys * rnd.random() ** 2)}'
+        if cache.get(key) is None:
+            cache.set(key, VALUE)
+        else:
+            hits += 1
+    return hits, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает долю попаданий и скорость кэшей '
+            'при работе нескольких процессов-воркеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=20000)
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument('--backends', nargs='+',
+                            default=list(settings.CACHE_BACKENDS))
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write(f'{"backend":<8} {"workers":>7} '
+                          f'{"hit rate":>9} {"ops/s":>10}')
+        for name in options['backends']:
+            with tempfile.TemporaryDirectory() as directory:
+                location = os.path.join(directory, 'cache.sqlite3')
+                with Pool(workers) as pool:
+                    results = pool.starmap(run_worker, [
+                        (name, location, options['keys'],
+                         options['operations'], seed)
+                        for seed in range(workers)
+                    ])
+            hits = sum(hits for hits, _ in results)
+            total = workers * options['operations']
+            elapsed = max(elapsed for _, elapsed in results)
+            self.stdout.write(f'{name:<8} {workers:>7} '
+                              f'{hits / total:>9.1%} '
+                              f'{total / elapsed:>10.0f}')
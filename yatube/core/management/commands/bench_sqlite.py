@@ -0,0 +1,114 @@
+import os
+import random
+import tempfile
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ALIAS = 'bench'
+POSTS = 100
+# как база настроена до и после тюнинга
+CONFIGS = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0},
+    'tuned': {'ENGINE': 'core.backends.sqlite3', 'CONN_MAX_AGE': 60},
+}
+
+
+def connect(name, path):
+    if hasattr(connections._connections, ALIAS):
+        # соединение от прошлой конфигурации
+        connections[ALIAS].close()
+        delattr(connections._connections, ALIAS)
+    connections.databases[ALIAS] = {
+        **connections.databases['default'], **CONFIGS[name], 'NAME': path}
+    return connections[ALIAS]
+
+
+def prepare(name, path):
+    connection = connect(name, path)
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TABLE comment (id INTEGER PRIMARY KEY, '
+                       'post_id INTEGER NOT NULL, text TEXT NOT NULL)')
+        cursor.execute('CREATE INDEX comment_post ON comment (post_id, id)')
+        cursor.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, '
+                       'comment_count INTEGER NOT NULL)')
+        cursor.executemany('INSERT INTO post VALUES (%s, 0)',
+                           [(pk,) for pk in range(POSTS)])
+    connection.close()
+
+
+def read(cursor, post_id):
+    cursor.execute('SELECT id, text FROM comment WHERE post_id = %s '
+                   'ORDER BY id DESC LIMIT 10', [post_id])
+    cursor.fetchall()
+
+
+def write(cursor, post_id):
+    # как add_comment: сначала читаем пост, затем пишем в той же транзакции
+    cursor.execute('SELECT comment_count FROM post WHERE id = %s', [post_id])
+    cursor.fetchone()
+    cursor.execute('INSERT INTO comment (post_id, text) VALUES (%s, %s)',
+                   [post_id, 'Комментарий'])
+    cursor.execute('UPDATE post SET comment_count = comment_count + 1 '
+                   'WHERE id = %s', [post_id])
+
+
+def run_worker(name, path, operations, writes, seed):
+    connection = connect(name, path)
+    rnd = random.Random(seed)
+    locked = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        post_id = rnd.randrange(POSTS)
+        try:
+            if rnd.random() < writes:
+                with transaction.atomic(using=ALIAS):
+                    with connection.cursor() as cursor:
+                        write(cursor, post_id)
+            else:
+                with connection.cursor() as cursor:
+                    read(cursor, post_id)
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            locked += 1
+        # конец «запроса»: без CONN_MAX_AGE соединение закрывается
+        connection.close_if_unusable_or_obsolete()
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return locked, elapsed
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SQLite с настройками по умолчанию и настроенный '
+            'бэкенд при конкурентных чтениях и записях')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--writes', type=float, default=0.2,
+                            help='Доля операций записи')
+        parser.add_argument('--configs', nargs='+', choices=list(CONFIGS),
+                            default=list(CONFIGS))
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        total = workers * options['operations']
+        self.stdout.write(f'{"config":<8} {"workers":>7} {"ops/s":>10} '
+                          f'{"locked":>7}')
+        for name in options['configs']:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                prepare(name, path)
+                with Pool(workers) as pool:
+                    results = pool.starmap(run_worker, [
+                        (name, path, options['operations'],
+                         options['writes'], seed)
+                        for seed in range(workers)
+                    ])
+            locked = sum(locked for locked, _ in results)
+            elapsed = max(elapsed for _, elapsed in results)
+            self.stdout.write(f'{name:<8} {workers:>7} '
+                              f'{total / elapsed:>10.0f} {locked:>7}')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import replication
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик: '
+            'замена репликации для локальной разработки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза между копиями в секундах')
+        parser.add_argument('--once', action='store_true',
+                            help='Сделать одну копию и завершиться')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                replication.sync_all()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
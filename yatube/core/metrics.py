@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque, namedtuple
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+# границы корзин гистограммы времени ответа, мс
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+Sample = namedtuple('Sample', ('queries', 'db_time', 'render_time', 'total',
+                               'cache_hits', 'cache_misses'))
+
+current = ContextVar('metrics_recorder', default=None)
+_lock = threading.Lock()
+_samples = {}
+_gauges = {}
+
+
+class Recorder:
+    """Собирает показатели одного запроса.
+
+    Передаётся в ``connection.execute_wrapper`` и считает SQL-запросы
+    и время, проведённое в базе.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def sample(self, total):
+        return Sample(self.queries, self.db_time, self.render_time, total,
+                      self.cache_hits, self.cache_misses)
+
+
+def cache_lookup(hit):
+    recorder = current.get()
+    if recorder is None:
+        return
+    if hit:
+        recorder.cache_hits += 1
+    else:
+        recorder.cache_misses += 1
+
+
+def record(view_name, sample):
+    with _lock:
+        samples = _samples.get(view_name)
+        if samples is None:
+            samples = _samples[view_name] = deque(
+                maxlen=settings.METRICS_WINDOW)
+        samples.append(sample)
+
+
+def last(view_name):
+    with _lock:
+        samples = _samples.get(view_name)
+        return samples[-1] if samples else None
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def gauge(name, read):
+    """Регистрирует показатель, который читается при построении сводки,
+    например отставание фонового обработчика."""
+    _gauges[name] = read
+
+
+def gauges():
+    return {name: read() for name, read in sorted(_gauges.items())}
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def histogram(totals):
+    counts = dict.fromkeys([f'<={bound}' for bound in BUCKETS]
+                           + [f'>{BUCKETS[-1]}'], 0)
+    for total in totals:
+        for bound in BUCKETS:
+            if total <= bound:
+                counts[f'<={bound}'] += 1
+                break
+        else:
+            counts[f'>{BUCKETS[-1]}'] += 1
+    return counts
+
+
+def summary():
+    """Сводка по последним METRICS_WINDOW запросам каждой страницы,
+    время в миллисекундах."""
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+    result = {}
+    for name, samples in sorted(snapshot.items()):
+        queries = [sample.queries for sample in samples]
+        db = sorted(sample.db_time * 1000 for sample in samples)
+        render = sorted(sample.render_time * 1000 for sample in samples)
+        total = sorted(sample.total * 1000 for sample in samples)
+        result[name] = {
+            'requests': len(samples),
+            'queries': {'mean': sum(queries) / len(queries),
+                        'max': max(queries)},
+            'db_ms': {'p50': percentile(db, .5), 'p95': percentile(db, .95)},
+            'render_ms': {'p50': percentile(render, .5),
+                          'p95': percentile(render, .95)},
+            'total_ms': {'p50': percentile(total, .5),
+                         'p95': percentile(total, .95),
+                         'p99': percentile(total, .99)},
+            'histogram_ms': histogram(total),
+            'cache': {'hits': sum(sample.cache_hits for sample in samples),
+                      'misses': sum(sample.cache_misses
+                                    for sample in samples)},
+        }
+    return result
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder = current.get()
+            if recorder is not None:
+                recorder.render_time += time.perf_counter() - start
+
+
+class TimedTemplates(DjangoTemplates):
+    """Шаблонизатор Django, засекающий время отрисовки страниц."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template,
+                             self)
@@ -0,0 +1,93 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers, streaming
+
+
+@contextmanager
+def recording(recorder):
+    """Запросы к базе внутри блока считает ``recorder``."""
+    token = metrics.current.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield
+    finally:
+        metrics.current.reset(token)
+
+
+class MetricsMiddleware:
+    """Записывает число SQL-запросов, время в базе, время отрисовки
+    и попадания в кэш для каждой страницы по имени её маршрута."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = metrics.Recorder()
+        start = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        if response.streaming:
+            # потоковая страница читает базу и во время отправки
+            response.streaming_content = self.streamed(
+                response.streaming_content, request, recorder, start)
+        else:
+            self.record(request, recorder, start)
+        return response
+
+    def streamed(self, content, request, recorder, start):
+        yield from streaming.chunks_within(content,
+                                           lambda: recording(recorder))
+        self.record(request, recorder, start)
+
+    def record(self, request, recorder, start):
+        match = request.resolver_match
+        if match is not None:
+            metrics.record(match.view_name,
+                           recorder.sample(time.perf_counter() - start))
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплики для страниц из REPLICA_VIEWS.
+
+    Пользователь, который только что что-то записал, получает cookie
+    и ещё REPLICA_STICKY_SECONDS читает с основной базы: реплика могла
+    не успеть получить его изменения.
+    """
+    cookie_name = 'primary_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = routers.Routing()
+        with routers.routed(routing):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = streaming.chunks_within(
+                response.streaming_content, lambda: routers.routed(routing))
+        if routing.wrote:
+            response.set_cookie(
+                self.cookie_name,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES[self.cookie_name]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = routers.current.get()
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name in settings.REPLICA_VIEWS
+                and not self.pinned(request)):
+            routing.alias = routers.pick_replica()
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.db import connections
+from django.db.transaction import TransactionManagementError
+
+
+def sync(replica, primary='default'):
+    """Копирует основную базу SQLite в файл реплики.
+
+    Заменяет настоящую репликацию при локальной разработке и в тестах:
+    между вызовами реплика отстаёт от основной базы, как при
+    асинхронной репликации. Используется online backup API SQLite,
+    поэтому писатели основной базы не останавливаются.
+    """
+    source = connections[primary]
+    if source.in_atomic_block:
+        # копия из незавершённой транзакции ждала бы её конца вечно
+        raise TransactionManagementError(
+            'Реплику нельзя обновить внутри транзакции основной базы.')
+    source.ensure_connection()
+    target = sqlite3.connect(connections[replica].settings_dict['NAME'])
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+
+
+def sync_all():
+    for replica in settings.DATABASE_REPLICAS:
+        sync(replica)
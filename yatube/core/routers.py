@@ -0,0 +1,91 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# таблицы этих приложений читаются только с основной базы:
+# сессия должна быть видна сразу после входа
+PRIMARY_APPS = ('sessions',)
+
+current = ContextVar('db_routing', default=None)
+
+
+class Routing:
+    """Куда идут запросы чтения текущего HTTP-запроса.
+
+    ``alias`` - реплика, выбранная для страницы, или None. После первой
+    записи (``wrote``) чтение до конца запроса идёт с основной базы.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias
+        self.wrote = False
+
+
+@contextmanager
+def routed(routing):
+    """Чтение внутри блока направляет ``routing``."""
+    token = current.set(routing)
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+def reading_replica():
+    """Читает ли текущий запрос с реплики."""
+    routing = current.get()
+    return (routing is not None and routing.alias is not None
+            and not routing.wrote)
+
+
+@contextmanager
+def primary():
+    """Чтение внутри блока идёт с основной базы.
+
+    Так заполняются общие кэши, которые сбрасывает запись: отставшая
+    реплика положила бы в них строки до записи, и их увидели бы все.
+    """
+    routing = current.get()
+    if routing is None or routing.alias is None:
+        yield
+        return
+    alias, routing.alias = routing.alias, None
+    try:
+        yield
+    finally:
+        routing.alias = alias
+
+
+def pick_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """Отправляет чтение страниц-лент на реплики, всё остальное -
+    на основную базу ``default``."""
+
+    def db_for_read(self, model, **hints):
+        routing = current.get()
+        if (routing is None or routing.alias is None or routing.wrote
+                or model._meta.app_label in PRIMARY_APPS):
+            return 'default'
+        return routing.alias
+
+    def db_for_write(self, model, **hints):
+        routing = current.get()
+        if routing is not None:
+            routing.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной базе
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схему реплики приносит репликация, а не migrate
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,163 @@
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template import loader
+from django.template.base import TextNode
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader_tags import (BLOCK_CONTEXT_KEY, BlockContext,
+                                         BlockNode, ExtendsNode, IncludeNode)
+
+
+def iter_nodes(nodelist, context):
+    """Отрисовывает ``nodelist`` по частям.
+
+    Наследование, блоки, include и циклы for раскрываются в генераторы,
+    остальные теги отдаются строкой целиком. Узел с методом
+    ``stream(context)`` отрисовывает себя по частям сам.
+    """
+    for node in nodelist:
+        if isinstance(node, ExtendsNode):
+            yield from iter_extends(node, context)
+        elif isinstance(node, BlockNode):
+            yield from iter_block(node, context)
+        elif isinstance(node, IncludeNode):
+            yield from iter_include(node, context)
+        elif isinstance(node, ForNode):
+            yield from iter_for(node, context)
+        elif hasattr(node, 'stream'):
+            yield from node.stream(context)
+        else:
+            yield node.render_annotated(context)
+
+
+def iter_extends(node, context):
+    # то же, что ExtendsNode.render
+    parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    for child in parent.nodelist:
+        if not isinstance(child, TextNode):
+            if not isinstance(child, ExtendsNode):
+                block_context.add_blocks({
+                    block.name: block for block in
+                    parent.nodelist.get_nodes_by_type(BlockNode)})
+            break
+    with context.render_context.push_state(parent, isolated_context=False):
+        yield from iter_nodes(parent.nodelist, context)
+
+
+def iter_block(node, context):
+    # то же, что BlockNode.render
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context['block'] = node
+            yield from iter_nodes(node.nodelist, context)
+            return
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        yield from iter_nodes(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def iter_include(node, context):
+    # то же, что IncludeNode.render
+    template = node.template.resolve(context)
+    if not callable(getattr(template, 'render', None)):
+        cache = context.render_context.dicts[0].setdefault(node, {})
+        name = template
+        template = cache.get(name)
+        if template is None:
+            template = context.template.engine.get_template(name)
+            cache[name] = template
+    elif hasattr(template, 'template'):
+        template = template.template
+    values = {name: var.resolve(context)
+              for name, var in node.extra_context.items()}
+    if node.isolated_context:
+        context = context.new(values)
+        with context.render_context.push_state(template):
+            yield from iter_nodes(template.nodelist, context)
+        return
+    with context.push(**values), context.render_context.push_state(template):
+        yield from iter_nodes(template.nodelist, context)
+
+
+def iter_for(node, context):
+    """Цикл for, который не превращает последовательность в список.
+
+    Элементы читаются по одному с упреждением на один, поэтому
+    ``forloop.last`` работает, а ``revcounter`` нет - длина заранее
+    неизвестна. Развёрнутые циклы и распаковку отдаём ForNode.
+    """
+    if node.is_reversed or len(node.loopvars) > 1:
+        yield node.render_annotated(context)
+        return
+    parentloop = context['forloop'] if 'forloop' in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        values = iter(values if values is not None else ())
+        sentinel = object()
+        item = next(values, sentinel)
+        if item is sentinel:
+            yield node.nodelist_empty.render(context)
+            return
+        loop = context['forloop'] = {'parentloop': parentloop}
+        counter = 0
+        while item is not sentinel:
+            following = next(values, sentinel)
+            loop.update(counter0=counter, counter=counter + 1,
+                        first=counter == 0, last=following is sentinel)
+            context[node.loopvars[0]] = item
+            yield from iter_nodes(node.nodelist_loop, context)
+            item = following
+            counter += 1
+
+
+def iter_template(template_name, context=None, request=None):
+    template = loader.get_template(template_name)
+    context = make_context(context, request,
+                           autoescape=template.backend.engine.autoescape)
+    template = template.template
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            yield from iter_nodes(template.nodelist, context)
+
+
+def stream(request, template_name, context=None, status=None):
+    """Аналог render(), который отдаёт страницу по мере отрисовки.
+
+    Запросы к базе, которые шаблон делает в циклах, выполняются уже
+    во время отправки ответа, поэтому время до первого байта и память
+    не зависят от длины страницы. Cookie CSRF выставляется заранее:
+    {% csrf_token %} отрисуется уже после CsrfViewMiddleware.
+    """
+    if request is not None:
+        get_token(request)
+    return StreamingHttpResponse(
+        (chunk for chunk in iter_template(template_name, context, request)
+         if chunk),
+        status=status)
+
+
+def chunks_within(content, context):
+    """Отдаёт части ``content``, получая каждую внутри ``context()``.
+
+    Так middleware продлевает свои контексты (маршрутизацию чтения,
+    учёт запросов) на время отправки потоковой страницы.
+    """
+    iterator = iter(content)
+    while True:
+        with context():
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,23 @@
+from . import metrics
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета SQL-запросов страницы по данным MetricsMiddleware.
+
+    Использование::
+
+        self.assertQueryBudget('posts:post_detail', url, 4)
+    """
+
+    def assertQueryBudget(self, view_name, url, budget, client=None):
+        metrics.reset()
+        response = (client or self.client).get(url)
+        if response.streaming:
+            # потоковая страница учитывается, когда отдана целиком
+            b''.join(response.streaming_content)
+        sample = metrics.last(view_name)
+        self.assertIsNotNone(sample, f'{url} не попал в {view_name}')
+        self.assertLessEqual(
+            sample.queries, budget,
+            f'{view_name}: {sample.queries} запросов при бюджете {budget}')
+        return response
@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+from multiprocessing import Pool
+
+from django.test import SimpleTestCase
+
+from core.cache.sqlite import SQLiteCache
+
+
+def make_cache(location, **options):
+    return SQLiteCache(location, {'OPTIONS': options})
+
+
+def increment(location):
+    cache = make_cache(location)
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = make_cache(self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Основные операции кэша"""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'другое'))
+        self.assertTrue(self.cache.add('new', 'значение'))
+        self.assertEqual(self.cache.get_many(['key', 'new', 'missing']),
+                         {'key': {'value': 1}, 'new': 'значение'})
+        self.cache.delete_many(['key', 'new'])
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('expired', 1, timeout=0)
+        self.assertFalse(self.cache.has_key('expired'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_shared_between_processes(self):
+        """Процессы видят записи друг друга, incr атомарен"""
+        self.cache.set('counter', 0)
+        with Pool(4) as pool:
+            pool.map(increment, [self.location] * 4)
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_least_recently_used_culled(self):
+        """При переполнении вытесняются давно не читавшиеся ключи"""
+        cache = make_cache(self.location, MAX_ENTRIES=10, CULL_FREQUENCY=2,
+                           CULL_EVERY=1)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        cache._db.execute('UPDATE cache SET accessed = accessed - 100 '
+                          'WHERE key != ?', (cache.make_key('key0'),))
+        cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertEqual(cache.get('key10'), 10)
+        self.assertEqual(
+            cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0], 6)
+
+    def test_get_many_marks_keys_used(self):
+        """Ключи, прочитанные через get_many, тоже не вытесняются первыми"""
+        cache = make_cache(self.location, MAX_ENTRIES=10, CULL_FREQUENCY=2,
+                           CULL_EVERY=1)
+        for i in range(10):
+            cache.set(f'key{i}', i)
+        cache._db.execute('UPDATE cache SET accessed = accessed - 100')
+        self.assertEqual(cache.get_many(['key0', 'key1']),
+                         {'key0': 0, 'key1': 1})
+        cache.set('key10', 10)
+        self.assertEqual(cache.get_many(['key0', 'key1', 'key10']),
+                         {'key0': 0, 'key1': 1, 'key10': 10})
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='User')
+        cls.staff = User.objects.create_user(username='Staff', is_staff=True)
+
+    def setUp(self):
+        metrics.reset()
+        self.client = Client()
+
+    def test_requests_are_recorded_by_view_name(self):
+        """Запрос записывается под именем маршрута"""
+        self.client.get(reverse('posts:index'))
+        sample = metrics.last('posts:index')
+        self.assertGreater(sample.queries, 0)
+        self.assertGreater(sample.render_time, 0)
+        self.assertGreaterEqual(sample.total, sample.render_time)
+
+    def test_summary_is_staff_only(self):
+        """Сводку видят только сотрудники"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('posts:index'))
+        summary = self.client.get(reverse('metrics')).json()
+        self.assertEqual(summary['posts:index']['requests'], 1)
+        self.assertEqual(sum(summary['posts:index']['histogram_ms'].values()),
+                         1)
@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import replication, routers
+from core.middleware import ReplicaMiddleware
+from posts import follows, pagecache
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TransactionTestCase):
+    """Две базы SQLite: тестовая основная и файл реплики, который
+    догоняет основную только при replication.sync. Копировать базу
+    можно только вне транзакции, поэтому TransactionTestCase."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.databases['replica'] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        delattr(connections._connections, 'replica')
+        del connections.databases['replica']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='TestAuthor')
+        self.reader = User.objects.create_user(username='Reader')
+        self.post = Post.objects.create(author=self.author,
+                                        text='Старый пост')
+        cache.clear()
+        replication.sync('replica')
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def posts_on_index(self):
+        return list(self.client.get(reverse('posts:index'))
+                               .context['page_obj'])
+
+    def test_feeds_read_from_replica(self):
+        """Ленты читаются с реплики, а не с основной базы"""
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(self.posts_on_index(), [self.post])
+        self.assertTrue(any('posts_post' in query['sql']
+                            for query in replica.captured_queries))
+        self.assertFalse(any('posts_post' in query['sql']
+                             for query in primary.captured_queries))
+
+    @override_settings(STREAMING_VIEWS=('posts:index',))
+    def test_streamed_pages_read_from_replica(self):
+        """Потоковая страница дочитывает ленту с реплики"""
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = self.client.get(reverse('posts:index'))
+            content = b''.join(response.streaming_content).decode()
+        self.assertIn(self.post.text, content)
+        self.assertTrue(any('posts_post' in query['sql']
+                            for query in replica.captured_queries))
+        self.assertFalse(any('posts_post' in query['sql']
+                             for query in primary.captured_queries))
+
+    def test_replica_lags_until_sync(self):
+        """Без синхронизации реплика не видит новых постов"""
+        new = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.posts_on_index(), [self.post])
+        replication.sync('replica')
+        cache.clear()
+        self.assertEqual(self.posts_on_index(), [new, self.post])
+
+    def test_lagging_replica_does_not_fill_cache(self):
+        """Страница, прочитанная с отставшей реплики сразу после записи,
+        не кэшируется: после синхронизации новый пост виден без сброса
+        кэша"""
+        new = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.posts_on_index(), [self.post])
+        replication.sync('replica')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, new.text)
+
+    def test_follow_set_filled_from_primary(self):
+        """Множество подписок в общий кэш читается с основной базы"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        token = routers.current.set(routers.Routing('replica'))
+        try:
+            self.assertIn(self.author.pk, follows.followed_ids(self.reader.pk))
+        finally:
+            routers.current.reset(token)
+
+    def test_lagging_replica_gets_no_validator(self):
+        """Страница с отставшей реплики после правки не получает ETag,
+        и старый текст не закрепляется у браузера"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.post.text = 'Исправленный'
+        self.post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Старый пост')
+        self.assertNotIn('ETag', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        replication.sync('replica')
+        # окно REPLICA_STICKY_SECONDS истекло
+        cache.delete(pagecache.written_key(('post', self.post.pk)))
+        response = self.client.get(url)
+        self.assertContains(response, 'Исправленный')
+        self.assertIn('ETag', response)
+
+    def test_writer_sticks_to_primary(self):
+        """После записи пользователь читает с основной базы"""
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Свой пост'})
+        self.assertIn(ReplicaMiddleware.cookie_name, response.cookies)
+        cache.clear()
+        texts = [post.text for post in self.posts_on_index()]
+        self.assertEqual(texts, ['Свой пост', 'Старый пост'])
+
+    def test_pin_expires(self):
+        """Истёкшая отметка снова отправляет чтение на реплику"""
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.client.cookies[ReplicaMiddleware.cookie_name] = str(
+            time.time() - 1)
+        self.assertEqual(self.posts_on_index(), [self.post])
+
+    def test_writes_go_to_primary(self):
+        """Подписка записывается в основную базу"""
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author}))
+        self.assertTrue(Follow.objects.filter(user=self.reader,
+                                              author=self.author).exists())
+
+    def test_other_views_read_from_primary(self):
+        """Страницы вне REPLICA_VIEWS читают с основной базы"""
+        self.client.force_login(self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(reverse('posts:post_edit',
+                                           kwargs={'post_id': post.pk}))
+        self.assertEqual(response.status_code, 200)
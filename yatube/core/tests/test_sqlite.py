@@ -0,0 +1,64 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import SimpleTestCase
+
+from core.management.commands import bench_sqlite
+
+
+class TunedSQLiteTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        self.connection = bench_sqlite.connect('tuned', self.path)
+
+    def tearDown(self):
+        self.connection.close()
+        delattr(connections._connections, bench_sqlite.ALIAS)
+        del connections.databases[bench_sqlite.ALIAS]
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Новое соединение получает WAL и остальные настройки"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('mmap_size'), 256 * 1024 * 1024)
+
+    def test_pragmas_can_be_overridden(self):
+        """OPTIONS['pragmas'] меняет значения по умолчанию"""
+        self.connection.close()
+        self.connection.settings_dict['OPTIONS'] = {
+            'pragmas': {'busy_timeout': 100}}
+        self.assertEqual(self.pragma('busy_timeout'), 100)
+
+    def test_transaction_takes_write_lock(self):
+        """Транзакция сразу берёт блокировку записи"""
+        other = sqlite3.connect(self.path, timeout=0,
+                                isolation_level=None)
+        with transaction.atomic(using=bench_sqlite.ALIAS):
+            self.pragma('user_version')
+            with self.assertRaisesMessage(sqlite3.OperationalError,
+                                          'locked'):
+                other.execute('BEGIN IMMEDIATE')
+        other.execute('BEGIN IMMEDIATE')
+        other.close()
+
+    def test_benchmark(self):
+        """Под конкурентной нагрузкой настроенный бэкенд не получает
+        «database is locked»"""
+        out = StringIO()
+        call_command('bench_sqlite', '--workers', '4', '--operations', '200',
+                     '--configs', 'tuned', stdout=out)
+        name, workers, _, locked = out.getvalue().splitlines()[1].split()
+        self.assertEqual((name, workers, locked), ('tuned', '4', '0'))
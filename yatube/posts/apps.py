@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from core import metrics
+
+        from . import outbox, signals  # noqa: F401
+        metrics.gauge('outbox_lag', outbox.lag_summary)
@@ -0,0 +1,132 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from . import pagecache
+from .models import Comment, Group, Post, User
+from .paginators import count_key
+
+# поколение подписчиков автора: меняется при подписке и отписке, чтобы
+# кнопка «Подписаться» в профиле не отдавалась из кэша браузера
+FOLLOWERS = 'followers'
+# поколение рекомендаций «кого читать» в профиле и ленте подписок
+SUGGESTIONS = ('suggestions',)
+
+
+def newest(queryset, field):
+    """Подзапрос последней даты по индексу, без обхода всей ленты."""
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+
+class State:
+    """Состояние страницы, по которому строится валидатор: ленты, чьи
+    поколения учитываются, последняя дата и число объектов."""
+
+    def __init__(self, feeds, latest, count, *extra):
+        self.feeds = feeds
+        self.latest = latest
+        self.count = count
+        self.extra = extra
+
+    def etag(self, request):
+        # страница, курсор и сортировка - из строки запроса, пользователь -
+        # по cookie сессии, чтобы не читать её из базы
+        source = repr((
+            [pagecache.generation(feed) for feed in self.feeds],
+            self.latest, self.count, self.extra,
+            request.GET.urlencode(),
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+        ))
+        return hashlib.md5(source.encode()).hexdigest()
+
+
+def conditional(state):
+    """Отвечает 304 на If-None-Match, не вызывая view.
+
+    ``state(request, **kwargs)`` одним запросом читает состояние страницы
+    или возвращает None, если объекта нет - тогда view отвечает сам.
+    Last-Modified не отдаётся: по дате последнего поста не видны правки,
+    удаления и вход под другим пользователем. Страницы личные, поэтому
+    браузер хранит их у себя и перепроверяет при каждом показе. Пока
+    реплика могла не догнать запись в ленту, валидатор не выдаётся.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            current = state(request, *args, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            if not all(map(pagecache.cacheable, current.feeds)):
+                # состояние прочитано с реплики вскоре после записи: оно
+                # могло отстать от поколения, и валидатор закрепил бы
+                # у браузера старую страницу
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            etag = quote_etag(current.etag(request))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.setdefault('ETag', etag)
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def index_state(request):
+    latest = Post.objects.aggregate(latest=Max('pub_date'))['latest']
+    # число постов - то, что закэшировал пагинатор, без COUNT(*)
+    return State([('index',)], latest, cache.get(count_key('index')))
+
+
+def group_state(request, slug):
+    row = (Group.objects.filter(slug=slug)
+                        .annotate(latest=newest(
+                            Post.objects.filter(group=OuterRef('pk')),
+                            'pub_date'))
+                        .values_list('pk', 'latest', 'post_count', 'title',
+                                     'description')
+                        .first())
+    if row is None:
+        return None
+    pk, latest, count, *extra = row
+    return State([('group', pk)], latest, count, *extra)
+
+
+def profile_state(request, username):
+    row = (User.objects.filter(username=username)
+                       .annotate(latest=newest(
+                           Post.objects.filter(author=OuterRef('pk')),
+                           'pub_date'))
+                       .values_list('pk', 'latest', 'counters__posts')
+                       .first())
+    if row is None:
+        return None
+    pk, latest, count = row
+    return State([('author', pk), (FOLLOWERS, pk), SUGGESTIONS],
+                 latest, count)
+
+
+def post_state(request, post_id):
+    row = (Post.objects.filter(pk=post_id)
+                       .annotate(commented=newest(
+                           Comment.objects.filter(post=OuterRef('pk')),
+                           'created'))
+                       .values_list('pub_date', 'commented', 'comment_count',
+                                    'author_id', 'author__counters__posts')
+                       .first())
+    if row is None:
+        return None
+    published, commented, count, author_id, author_posts = row
+    return State([('post', post_id), (FOLLOWERS, author_id)],
+                 max(filter(None, (published, commented))), count,
+                 author_posts)
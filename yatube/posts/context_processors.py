@@ -0,0 +1,7 @@
+from . import follows as follow_sets
+
+
+def follows(request):
+    return {
+        'follows': follow_sets.for_request(request),
+    }
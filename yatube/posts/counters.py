@@ -0,0 +1,65 @@
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Group, Post, UserCounters
+
+
+def count_of(model, field):
+    """Подзапрос COUNT(*) по ``field`` для строки внешнего запроса."""
+    return Coalesce(
+        Subquery(model.objects.filter(**{field: OuterRef('pk')})
+                              .order_by()
+                              .values(field)
+                              .annotate(total=Count('pk'))
+                              .values('total'),
+                 output_field=IntegerField()),
+        0,
+    )
+
+
+def recount(apps=global_apps):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Counters = apps.get_model('posts', 'UserCounters')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Group = apps.get_model('posts', 'Group')
+    with transaction.atomic():
+        Counters.objects.bulk_create(
+            (Counters(user_id=pk) for pk in User.objects.filter(
+                counters__isnull=True).values_list('pk', flat=True)),
+            ignore_conflicts=True,
+        )
+        Counters.objects.update(
+            posts=count_of(Post, 'author'),
+            followers=count_of(Follow, 'author'),
+            following=count_of(Follow, 'user'),
+        )
+        Group.objects.update(post_count=count_of(Post, 'group'))
+        Post.objects.update(comment_count=count_of(Comment, 'post'))
+
+
+def shifted(field, delta):
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_user(user_id, **deltas):
+    # строку создаёт сигнал user_created, её нет только у удаляемого
+    # пользователя (каскад удаляет её первой) - там и считать нечего;
+    # прочие расхождения чинит recount
+    UserCounters.objects.filter(user_id=user_id).update(
+        **{field: shifted(field, delta) for field, delta in deltas.items()})
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            post_count=shifted('post_count', delta))
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=shifted('comment_count', delta))
@@ -0,0 +1,231 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import outbox
+from .models import Follow, OutboxEvent
+
+# заголовок снимка: метка формата, позиция outbox, время снимка и число
+# пользователей; за ним три массива int32: id пользователей по возрастанию,
+# смещения их подписок и сами подписки по возрастанию id автора
+HEADER = struct.Struct('<4sqdi')
+MAGIC = b'YFG1'
+EMPTY = array('i')
+
+
+def contains(ids, value):
+    """Есть ли ``value`` в отсортированной последовательности ``ids``."""
+    i = bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+def dumps(rows, position=0, created=None):
+    """Снимок графа из пар (пользователь, автор), упорядоченных по обоим
+    полям, например ``Follow.objects.order_by('user', 'author')``."""
+    users, offsets, authors = array('i'), array('i', [0]), array('i')
+    for user_id, author_id in rows:
+        if not users or users[-1] != user_id:
+            if users:
+                offsets.append(len(authors))
+            users.append(user_id)
+        authors.append(author_id)
+    if users:
+        offsets.append(len(authors))
+    created = time.time() if created is None else created
+    return b''.join((HEADER.pack(MAGIC, position, created, len(users)),
+                     users.tobytes(), offsets.tobytes(), authors.tobytes()))
+
+
+class SharedIndex:
+    """Снимок графа только для чтения поверх буфера без копирования.
+
+    Буфером может быть mmap файла: тогда все воркеры на хосте читают
+    одни и те же страницы памяти. Подписки пользователя - срез
+    memoryview, в котором ищем бинарным поиском.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, self.position, self.created, count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError('Это не снимок графа подписок')
+        ints = view[HEADER.size:].cast('i')
+        self.users = ints[:count]
+        self.offsets = ints[count:2 * count + 1]
+        self.authors = ints[2 * count + 1:]
+
+    def __contains__(self, user_id):
+        return contains(self.users, user_id)
+
+    def get(self, user_id):
+        i = bisect_left(self.users, user_id)
+        if i == len(self.users) or self.users[i] != user_id:
+            return EMPTY
+        return self.authors[self.offsets[i]:self.offsets[i + 1]]
+
+
+def open_shared(path):
+    with open(path, 'rb') as snapshot:
+        return SharedIndex(mmap.mmap(snapshot.fileno(), 0,
+                                     access=mmap.ACCESS_READ))
+
+
+def save(path):
+    """Записывает снимок всего графа; файл подменяется атомарно."""
+    # позицию берём до чтения графа: изменения во время чтения
+    # воркеры потом применят ещё раз, это безопасно
+    created, position = time.time(), outbox.latest()
+    rows = (Follow.objects.order_by('user', 'author')
+                          .values_list('user', 'author')
+                          .iterator(chunk_size=10000))
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as snapshot:
+        snapshot.write(dumps(rows, position, created))
+    os.replace(temporary, path)
+    return position
+
+
+class FollowIndex:
+    """Подписки пользователей в памяти процесса: id авторов по
+    возрастанию в ``array('i')``, по 4 байта на подписку.
+
+    Подписки читаются из базы при первом обращении и вытесняются по LRU,
+    когда всего хранится больше FOLLOW_INDEX_MAX_IDS id. Если есть снимок
+    (SharedIndex), непрочитанные подписки берутся из него. Свои изменения
+    процесс применяет сразу, чужие - не позже чем через
+    FOLLOW_INDEX_POLL секунд, по событиям FOLLOWS из outbox. Кто не
+    читал outbox дольше OUTBOX_RETENTION, мог пропустить удалённые
+    события и начинает заново.
+    """
+
+    def __init__(self, shared=None, max_ids=None, poll=None):
+        self.shared = shared
+        self.max_ids = max_ids or settings.FOLLOW_INDEX_MAX_IDS
+        self.poll = settings.FOLLOW_INDEX_POLL if poll is None else poll
+        self.entries = OrderedDict()
+        self.size = 0
+        # пользователи, чьи подписки менялись после снимка
+        self.changed = set()
+        self.position = shared.position if shared is not None else None
+        # когда outbox прочитан последний раз и когда проверялся
+        self.synced = shared.created if shared is not None else time.time()
+        self.checked = 0.0
+        self.lock = threading.RLock()
+
+    def authors(self, user_id):
+        """id авторов, на которых подписан пользователь, по возрастанию."""
+        self.sync()
+        with self.lock:
+            ids = self.entries.get(user_id)
+            if ids is not None:
+                self.entries.move_to_end(user_id)
+                return ids
+            if self.shared is not None and user_id not in self.changed:
+                return self.shared.get(user_id)
+        ids = array('i', Follow.objects.filter(user=user_id)
+                                       .order_by('author')
+                                       .values_list('author', flat=True))
+        with self.lock:
+            self.store(user_id, ids)
+        return ids
+
+    def follows(self, user_id, author_id):
+        return contains(self.authors(user_id), author_id)
+
+    def store(self, user_id, ids):
+        previous = self.entries.pop(user_id, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[user_id] = ids
+        self.size += len(ids)
+        while self.size > self.max_ids and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def discard(self, user_id):
+        with self.lock:
+            ids = self.entries.pop(user_id, None)
+            if ids is not None:
+                self.size -= len(ids)
+            self.changed.add(user_id)
+
+    def update(self, user_id, author_id, added):
+        """Применяет подписку или отписку этого процесса."""
+        with self.lock:
+            ids = self.entries.get(user_id)
+            self.changed.add(user_id)
+            if ids is None:
+                return
+            i = bisect_left(ids, author_id)
+            present = i < len(ids) and ids[i] == author_id
+            if added and not present:
+                insort(ids, author_id)
+                self.size += 1
+            elif not added and present:
+                del ids[i]
+                self.size -= 1
+
+    def sync(self, force=False):
+        """Сбрасывает подписки, изменённые другими процессами."""
+        now = time.time()
+        if not force and now - self.checked < self.poll:
+            return
+        self.checked = now
+        if self.position is None:
+            # без снимка всё читается из базы уже после этой позиции
+            self.position, self.synced = outbox.latest(), now
+            return
+        if now - self.synced > settings.OUTBOX_RETENTION:
+            # нужные события уже могли удалить: не верим ни прочитанному,
+            # ни снимку
+            self.reset()
+            return
+        events = (OutboxEvent.objects.filter(kind=OutboxEvent.FOLLOWS,
+                                             pk__gt=self.position)
+                                     .order_by('pk')
+                                     .values_list('pk', 'object_id'))
+        for pk, user_id in events:
+            self.discard(user_id)
+            self.position = pk
+        self.synced = now
+
+    def reset(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.changed.clear()
+            self.shared = None
+            self.position, self.synced = outbox.latest(), time.time()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index():
+    """Индекс этого процесса; снимок FOLLOW_INDEX_SNAPSHOT, если он есть."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = settings.FOLLOW_INDEX_SNAPSHOT
+            shared = (open_shared(path) if path and os.path.exists(path)
+                      else None)
+            _index = FollowIndex(shared)
+        return _index
+
+
+def changed(user_id, author_id, added):
+    """Для сигналов: после фиксации транзакции обновляет индекс, если
+    процесс его уже создал."""
+    def apply():
+        if _index is not None:
+            _index.update(user_id, author_id, added)
+    transaction.on_commit(apply)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from core import routers
+
+from . import followgraph
+from .models import Follow
+
+CACHE_PREFIX = 'follow-set'
+
+
+def cache_key(user_id):
+    return f'{CACHE_PREFIX}:{user_id}'
+
+
+def followed_ids(user_id):
+    """id авторов, на которых подписан пользователь: из кэша или одним
+    запросом к базе. Без FOLLOW_SET_TIMEOUT кэш не используется."""
+    timeout = settings.FOLLOW_SET_TIMEOUT
+    key = cache_key(user_id)
+    ids = cache.get(key) if timeout else None
+    if ids is None:
+        with routers.primary():
+            ids = frozenset(Follow.objects.filter(user=user_id)
+                                          .values_list('author', flat=True))
+        if timeout:
+            cache.set(key, ids, timeout)
+    return ids
+
+
+def invalidate(user_id):
+    cache.delete(cache_key(user_id))
+
+
+class FollowSet:
+    """Подписки зрителя для проверки «подписан ли он на автора» за O(1).
+
+    Множество читается при первой проверке, один раз на запрос; у анонима
+    подписок нет и запросов тоже. С FOLLOW_INDEX подписки берутся из
+    графа в памяти воркера. Принимает автора или его id::
+
+        {% if post.author_id in follows %}
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+        if settings.FOLLOW_INDEX:
+            # id по возрастанию, проверка - бинарным поиском
+            return followgraph.index().authors(self.user.pk)
+        return followed_ids(self.user.pk)
+
+    def __contains__(self, author):
+        author_id = getattr(author, 'pk', author)
+        if isinstance(self.ids, frozenset):
+            return author_id in self.ids
+        return followgraph.contains(self.ids, author_id)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def for_request(request):
+    """Одно множество подписок на весь запрос: его делят view и шаблоны."""
+    if not hasattr(request, '_follow_set'):
+        request._follow_set = FollowSet(request.user)
+    return request._follow_set
@@ -0,0 +1,188 @@
+import json
+import random
+import time
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from core import metrics
+from posts.models import Comment, Follow, Group, Post, User
+from posts.seeding import Seeder
+
+# сколько объектов каждого вида передавать воркерам для запросов
+SAMPLE = 1000
+
+
+def index(targets, rnd):
+    return 'get', reverse('posts:index'), None
+
+
+def group_posts(targets, rnd):
+    return 'get', reverse('posts:group_list',
+                          kwargs={'slug': rnd.choice(targets['groups'])}), None
+
+
+def profile(targets, rnd):
+    return 'get', reverse('posts:profile', kwargs={
+        'username': rnd.choice(targets['authors'])}), None
+
+
+def post_detail(targets, rnd):
+    return 'get', reverse('posts:post_detail', kwargs={
+        'post_id': rnd.choice(targets['posts'])}), None
+
+
+def follow_index(targets, rnd):
+    return 'get', reverse('posts:follow_index'), None
+
+
+def add_comment(targets, rnd):
+    return 'post', reverse('posts:add_comment', kwargs={
+        'post_id': rnd.choice(targets['posts'])}), {'text': 'Комментарий'}
+
+
+def post_create(targets, rnd):
+    return 'post', reverse('posts:post_create'), {'text': 'Тестовый пост'}
+
+
+ENDPOINTS = {
+    'index': ('posts:index', index),
+    'group_posts': ('posts:group_list', group_posts),
+    'profile': ('posts:profile', profile),
+    'post_detail': ('posts:post_detail', post_detail),
+    'follow_index': ('posts:follow_index', follow_index),
+    'add_comment': ('posts:add_comment', add_comment),
+    'post_create': ('posts:post_create', post_create),
+}
+
+
+def run_worker(endpoint, targets, requests, seed):
+    view_name, make_request = ENDPOINTS[endpoint]
+    rnd = random.Random(seed)
+    client = Client()
+    client.force_login(User.objects.get(pk=targets['reader']))
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, url, data = make_request(targets, rnd)
+        start = time.perf_counter()
+        response = getattr(client, method)(url, data)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+        sample = metrics.last(view_name)
+        queries.append(sample.queries if sample else 0)
+    elapsed = time.perf_counter() - started
+    return latencies, queries, errors, elapsed
+
+
+def run_child(*job):
+    try:
+        return run_worker(*job)
+    finally:
+        # соединения процесса-клиента не переживут пул
+        connections.close_all()
+
+
+def summarize(results):
+    latencies = sorted(value * 1000 for result in results
+                       for value in result[0])
+    queries = [value for result in results for value in result[1]]
+    elapsed = max(result[3] for result in results)
+    return {
+        'requests': len(latencies),
+        'errors': sum(result[2] for result in results),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': metrics.percentile(latencies, .5),
+        'p95_ms': metrics.percentile(latencies, .95),
+        'p99_ms': metrics.percentile(latencies, .99),
+        'queries_per_request': sum(queries) / len(queries),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест лент и форм: задержки, запросы в секунду '
+            'и SQL-запросы на страницу')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Число параллельных клиентов-процессов')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на страницу от каждого клиента')
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS,
+                            default=list(ENDPOINTS))
+        parser.add_argument('--output', default='bench_feeds.json')
+        parser.add_argument('--seed', type=int, default=0)
+        for name in ('users', 'groups', 'posts', 'comments', 'follows'):
+            parser.add_argument(
+                f'--{name}', type=int, default=0,
+                help=f'Сначала добавить столько {name} в базу')
+
+    def targets(self):
+        reader = (User.objects.annotate(total=Count('follower'))
+                              .order_by('-total')
+                              .values_list('pk', flat=True).first())
+        return {
+            'reader': reader,
+            'groups': list(Group.objects.values_list('slug', flat=True)
+                                        .order_by('?')[:SAMPLE]),
+            'authors': list(User.objects.filter(posts__isnull=False)
+                                        .values_list('username', flat=True)
+                                        .distinct()
+                                        .order_by('?')[:SAMPLE]),
+            'posts': list(Post.objects.values_list('pk', flat=True)
+                                      .order_by('?')[:SAMPLE]),
+        }
+
+    def run(self, endpoint, targets, options):
+        jobs = [(endpoint, targets, options['requests'],
+                 options['seed'] + worker)
+                for worker in range(options['workers'])]
+        if options['workers'] == 1:
+            return [run_worker(*jobs[0])]
+        # дочерние процессы не должны унаследовать открытые соединения
+        connections.close_all()
+        with Pool(options['workers']) as pool:
+            return pool.starmap(run_child, jobs)
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in
+                 ('users', 'groups', 'posts', 'comments', 'follows')}
+        if any(sizes.values()):
+            started = time.perf_counter()
+            Seeder(options['seed']).run(**sizes)
+            self.stdout.write(
+                f'Данные созданы за {time.perf_counter() - started:.1f} с')
+        targets = self.targets()
+        if targets['reader'] is None or not targets['posts']:
+            self.stderr.write('В базе нет постов: добавьте данные, '
+                              'например --users 100 --posts 1000')
+            return
+        report = {
+            'date': timezone.now().isoformat(),
+            'workers': options['workers'],
+            'requests_per_worker': options['requests'],
+            'database': {model._meta.model_name: model.objects.count()
+                         for model in (User, Group, Post, Comment, Follow)},
+            'endpoints': {},
+        }
+        self.stdout.write(f'{"endpoint":<13} {"rps":>8} {"p50":>8} '
+                          f'{"p95":>8} {"p99":>8} {"queries":>8}')
+        for endpoint in options['endpoints']:
+            if endpoint == 'group_posts' and not targets['groups']:
+                continue
+            result = summarize(self.run(endpoint, targets, options))
+            report['endpoints'][endpoint] = result
+            self.stdout.write(
+                f'{endpoint:<13} {result["rps"]:>8.1f} '
+                f'{result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f} '
+                f'{result["p99_ms"]:>8.1f} '
+                f'{result["queries_per_request"]:>8.1f}')
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}'))
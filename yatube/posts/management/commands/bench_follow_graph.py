@@ -0,0 +1,148 @@
+import json
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import metrics
+from posts import followgraph
+from posts.models import Follow, Post, User, UserCounters
+from posts.seeding import Seeder
+
+
+def timed(operation, repeat):
+    """Задержки ``repeat`` вызовов в микросекундах."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return sorted(latencies)
+
+
+def summarize(latencies):
+    return {
+        'p50_us': metrics.percentile(latencies, .5),
+        'p95_us': metrics.percentile(latencies, .95),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает граф подписок в памяти с запросами к Follow: '
+            'проверка подписки, список авторов и страница ленты')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20,
+                            help='Сколько самых активных читателей брать')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Повторов каждой операции')
+        parser.add_argument('--output', default='bench_follow_graph.json')
+        parser.add_argument('--seed', type=int, default=0)
+        for name in ('users', 'posts', 'follows'):
+            parser.add_argument(
+                f'--seed-{name}', type=int, default=0,
+                help=f'Сначала добавить столько {name} в базу')
+
+    def operations(self, graph, user_id, authors, rnd):
+        """Пары «SQL - индекс» для одного читателя."""
+        candidates = list(authors) + list(
+            User.objects.values_list('pk', flat=True)[:len(authors) or 1])
+
+        def sql_follows():
+            Follow.objects.filter(user=user_id,
+                                  author=rnd.choice(candidates)).exists()
+
+        def index_follows():
+            graph.follows(user_id, rnd.choice(candidates))
+
+        def sql_authors():
+            list(Follow.objects.filter(user=user_id)
+                               .values_list('author', flat=True))
+
+        def index_authors():
+            graph.authors(user_id)
+
+        def sql_page():
+            list(Post.objects.filter(author__following__user=user_id)
+                             .order_by('-pub_date', '-pk')
+                             .values_list('pk', flat=True)[:10])
+
+        def index_page():
+            list(Post.objects.filter(author__in=list(graph.authors(user_id)))
+                             .order_by('-pub_date', '-pk')
+                             .values_list('pk', flat=True)[:10])
+
+        return {
+            'follows': (sql_follows, index_follows),
+            'authors': (sql_authors, index_authors),
+            'feed_page': (sql_page, index_page),
+        }
+
+    def handle(self, *args, **options):
+        sizes = {name: options[f'seed_{name}']
+                 for name in ('users', 'posts', 'follows')}
+        if any(sizes.values()):
+            Seeder(options['seed']).run(**sizes)
+        readers = UserCounters.objects.filter(following__gt=0).order_by(
+            '-following').values_list('user_id', flat=True)
+        readers = list(readers[:options['users']])
+        if not readers:
+            self.stderr.write('В базе нет подписок: добавьте данные, '
+                              'например --seed-users 1000 --seed-follows '
+                              '100000')
+            return
+        rnd = random.Random(options['seed'])
+        report = {
+            'date': timezone.now().isoformat(),
+            'follows': Follow.objects.count(),
+            'readers': len(readers),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'follow-graph')
+            started = time.perf_counter()
+            followgraph.save(path)
+            report['snapshot'] = {
+                'build_ms': (time.perf_counter() - started) * 1000,
+                'bytes': os.path.getsize(path),
+            }
+            started = time.perf_counter()
+            shared = followgraph.open_shared(path)
+            report['snapshot']['open_us'] = (
+                (time.perf_counter() - started) * 1e6)
+            graphs = {
+                'memory': followgraph.FollowIndex(),
+                'shared': followgraph.FollowIndex(shared),
+            }
+            results = {}
+            for user_id in readers:
+                authors = graphs['memory'].authors(user_id)
+                for graph_name, graph in graphs.items():
+                    operations = self.operations(graph, user_id, authors, rnd)
+                    for name, (sql, indexed) in operations.items():
+                        for method, operation in (('sql', sql),
+                                                  (graph_name, indexed)):
+                            results.setdefault(name, {}).setdefault(
+                                method, []).extend(
+                                    timed(operation, options['repeat']))
+        report['operations'] = {
+            name: {method: summarize(sorted(latencies))
+                   for method, latencies in methods.items()}
+            for name, methods in results.items()
+        }
+        self.stdout.write(f'снимок: {report["snapshot"]["bytes"]} байт, '
+                          f'{report["snapshot"]["build_ms"]:.0f} мс, '
+                          f'открытие {report["snapshot"]["open_us"]:.0f} мкс')
+        self.stdout.write(f'{"operation":<10} {"method":<7} {"p50_us":>9} '
+                          f'{"p95_us":>9}')
+        for name, methods in report['operations'].items():
+            for method, result in methods.items():
+                self.stdout.write(f'{name:<10} {method:<7} '
+                                  f'{result["p50_us"]:>9.1f} '
+                                  f'{result["p95_us"]:>9.1f}')
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}'))
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import outbox
+
+
+class Command(BaseCommand):
+    help = ('Применяет изменения постов и комментариев из outbox '
+            'к производным индексам (поиск)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumers', nargs='+',
+                            choices=list(outbox.CONSUMERS),
+                            default=list(outbox.CONSUMERS))
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float,
+                            default=settings.OUTBOX_POLL_INTERVAL,
+                            help='Пауза в секундах, когда событий нет')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать накопленное и завершиться')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                done = self.process(options)
+                if done:
+                    continue
+                outbox.prune()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def process(self, options):
+        done = 0
+        for consumer in options['consumers']:
+            processed = outbox.process_batch(consumer, options['batch_size'])
+            if processed:
+                lag = outbox.lag(consumer)
+                self.stdout.write(
+                    f'{consumer}: обработано {processed}, '
+                    f'в очереди {lag["pending"]}, '
+                    f'отставание {lag["seconds"]:.1f} с')
+            done += processed
+        return done
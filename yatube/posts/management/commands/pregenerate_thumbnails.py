@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков; 0 - готовить в текущем потоке')
+
+    def handle(self, *args, **options):
+        names = (Post.objects.exclude(image='')
+                             .values_list('image', flat=True)
+                             .distinct()
+                             .iterator())
+        if options['workers'] > 0:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                done = sum(1 for _ in pool.map(thumbnails.run, names))
+        else:
+            done = sum(1 for _ in map(thumbnails.generate, names))
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры подготовлены для {done} картинок'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рейтинг постов главной ленты; '
+            'запускается периодически, например из cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='Сколько постов сохранить, '
+                                 'по умолчанию RANKING_TOP_K')
+
+    def handle(self, *args, **options):
+        ids = ranking.rank(k=options['top'])
+        self.stdout.write(self.style.SUCCESS(
+            f'В ленте {ranking.INDEX} сохранено {len(ids)} постов'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «кого читать» для всех '
+            'пользователей по графу подписок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=None,
+                            help='Сколько авторов предлагать, '
+                                 'по умолчанию RECOMMENDATIONS_TOP_N')
+
+    def handle(self, *args, **options):
+        stored = recommendations.rebuild(options['top'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено рекомендаций: {stored}'))
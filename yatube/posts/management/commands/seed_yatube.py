@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, Timeline, User
+from posts.seeding import BATCH_SIZE, Seeder
+
+MODELS = (User, Group, Post, Comment, Follow, Timeline)
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу пользователями, группами, постами, '
+            'комментариями и подписками для профилирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--images', type=float, default=0.0,
+                            help='Доля постов с картинкой, от 0 до 1')
+        parser.add_argument('--exponent', type=float, default=1.0,
+                            help='Показатель степенного закона '
+                                 'популярности авторов')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить даты')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--no-search', dest='search',
+                            action='store_false',
+                            help='Не перестраивать поисковый индекс')
+
+    def handle(self, *args, **options):
+        before = {model: model.objects.count() for model in MODELS}
+        started = time.perf_counter()
+        seeder = Seeder(options['seed'], days=options['days'],
+                        exponent=options['exponent'],
+                        images=options['images'],
+                        batch_size=options['batch_size'])
+        seeder.run(**{name: options[name] for name in
+                      ('users', 'groups', 'posts', 'comments', 'follows')},
+                   search_index=False)
+        elapsed = time.perf_counter() - started
+        added = {model: model.objects.count() - count
+                 for model, count in before.items()}
+        for model, count in added.items():
+            self.stdout.write(f'{model._meta.verbose_name_plural}: '
+                              f'{count:+}')
+        # строки лент не загружаются, а выводятся из подписок при пересчёте
+        loaded = sum(count for model, count in added.items()
+                     if model is not Timeline)
+        load = seeder.timings['load']
+        self.stdout.write(f'Загрузка: {loaded} строк за {load:.1f} с '
+                          f'({loaded / load:.0f} строк/с)')
+        self.stdout.write(f'Пересчёт счётчиков и лент: '
+                          f'{seeder.timings["rebuild"]:.1f} с')
+        rows = sum(added.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено {rows} строк за {elapsed:.1f} с '
+            f'({rows / elapsed:.0f} строк/с)'))
+        if not options['search']:
+            return
+        # индекс строится после замера: это разбор текста, а не загрузка
+        started = time.perf_counter()
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(
+            f'Поисковый индекс перестроен за '
+            f'{time.perf_counter() - started:.1f} с')
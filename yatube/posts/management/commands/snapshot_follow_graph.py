@@ -0,0 +1,23 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import followgraph
+
+
+class Command(BaseCommand):
+    help = ('Записывает снимок графа подписок, который воркеры '
+            'открывают через mmap (FOLLOW_INDEX_SNAPSHOT)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.FOLLOW_INDEX_SNAPSHOT)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError('Укажите --path или YATUBE_FOLLOW_INDEX')
+        position = followgraph.save(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок записан в {path}: {os.path.getsize(path)} байт, '
+            f'позиция outbox {position}'))
@@ -0,0 +1,119 @@
+import heapq
+from itertools import islice, takewhile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from core import routers
+
+from . import follows
+from .models import Post
+from .paginators import CursorPaginator
+
+
+def cache_key(author_id):
+    return f'mergefeed:author:{author_id}'
+
+
+def invalidate(author_id):
+    cache.delete(cache_key(author_id))
+
+
+def recent(author_ids):
+    """Последние посты авторов: {id автора: (ключи, полный ли список)}.
+
+    Ключи - пары (pub_date, pk) по убыванию, не больше
+    FOLLOW_FEED_AUTHOR_POSTS на автора. Списки лежат в кэше; кого там
+    нет, читаются одним запросом.
+    """
+    keys = {cache_key(author_id): author_id for author_id in author_ids}
+    lists = {keys[key]: value
+             for key, value in cache.get_many(list(keys)).items()}
+    missing = [author_id for author_id in author_ids
+               if author_id not in lists]
+    if not missing:
+        return lists
+    limit = settings.FOLLOW_FEED_AUTHOR_POSTS
+    newest = (Post.objects.filter(author=OuterRef('author'))
+                          .order_by('-pub_date', '-pk')
+                          .values('pk')[:limit + 1])
+    rows = (Post.objects.filter(author__in=missing, pk__in=Subquery(newest))
+                        .order_by('author', '-pub_date', '-pk')
+                        .values_list('author', 'pub_date', 'pk'))
+    fetched = {author_id: [] for author_id in missing}
+    with routers.primary():
+        for author_id, pub_date, pk in rows:
+            fetched[author_id].append((pub_date, pk))
+    fresh = {author_id: (tuple(posts[:limit]), len(posts) <= limit)
+             for author_id, posts in fetched.items()}
+    cache.set_many({cache_key(author_id): value
+                    for author_id, value in fresh.items()},
+                   settings.FOLLOW_FEED_TIMEOUT)
+    lists.update(fresh)
+    return lists
+
+
+class MergeFeedPaginator(CursorPaginator):
+    """Лента подписок слиянием списков последних постов авторов.
+
+    Ключи (pub_date, pk) авторов, на которых подписан читатель,
+    сливаются в ``heapq.merge``, пока не наберётся страница; из базы
+    читаются только посты этой страницы. Кому не хватило списка из кэша,
+    дочитывается из базы по индексу (author, pub_date). Порядок и курсоры
+    те же, что у запроса ``author__following__user``.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(Post.objects.select_related('group', 'author'),
+                         per_page)
+        self.user = user
+
+    def scan(self, author_id, position, backwards):
+        """Ключи постов автора после ``position``, страницами из базы."""
+        queryset = (Post.objects.filter(author_id=author_id)
+                                .values_list('pub_date', 'pk'))
+        while True:
+            chunk = list(self.slice(queryset, position, backwards)
+                         [:self.per_page + 1])
+            yield from chunk
+            if len(chunk) <= self.per_page:
+                return
+            position = chunk[-1]
+
+    def keys(self, author_id, head, complete, position, backwards):
+        """Ключи автора после ``position`` в порядке страницы."""
+        if not backwards:
+            yield from (key for key in head
+                        if position is None or key < position)
+            if not complete:
+                tail = head[-1]
+                yield from self.scan(
+                    author_id,
+                    tail if position is None else min(tail, position),
+                    False)
+            return
+        if not complete and position < head[-1]:
+            # между позицией и концом списка посты есть только в базе
+            yield from takewhile(lambda key: key < head[-1],
+                                 self.scan(author_id, position, True))
+        yield from (key for key in reversed(head) if key > position)
+
+    def page(self, cursor=None):
+        position, backwards = None, False
+        if cursor is not None:
+            position, backwards = self.decode_cursor(cursor)
+        lists = recent(list(follows.FollowSet(self.user)))
+        keys = list(islice(
+            heapq.merge(*(self.keys(author_id, head, complete, position,
+                                    backwards)
+                          for author_id, (head, complete) in lists.items()),
+                        reverse=not backwards),
+            self.per_page + 1))
+        posts = self.object_list.in_bulk([pk for _, pk in keys])
+        rows = [posts[pk] for _, pk in keys if pk in posts]
+        return self.build_page(rows, cursor, position, backwards)
+
+    def stream_page(self, cursor=None, chunk_size=None):
+        # посты страницы читаются одним in_bulk, поток ничего не даёт
+        return self.get_page(cursor)
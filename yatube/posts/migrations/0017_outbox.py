@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCheckpoint',
+            fields=[
+                ('consumer', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='обработчик')),
+                ('position', models.BigIntegerField(default=0, verbose_name='последнее обработанное событие')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='время обработки')),
+            ],
+            options={
+                'verbose_name': 'Позиция обработчика outbox',
+                'verbose_name_plural': 'Позиции обработчиков outbox',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'пост'), ('comment', 'комментарий')], max_length=16, verbose_name='объект')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('action', models.CharField(choices=[('save', 'сохранён'), ('delete', 'удалён')], max_length=16, verbose_name='действие')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='время изменения')),
+            ],
+            options={
+                'verbose_name': 'Событие outbox',
+                'verbose_name_plural': 'События outbox',
+            },
+        ),
+    ]
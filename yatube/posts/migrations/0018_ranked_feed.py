@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankedFeed',
+            fields=[
+                ('feed', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='лента')),
+                ('post_ids', models.TextField(verbose_name='id постов по убыванию оценки')),
+                ('computed', models.DateTimeField(verbose_name='время расчёта')),
+            ],
+            options={
+                'verbose_name': 'Ранжированная лента',
+                'verbose_name_plural': 'Ранжированные ленты',
+            },
+        ),
+    ]
@@ -20,6 +20,11 @@ class Group(models.Model):
         "описание",
         help_text="введите описание сообщества",
     )
+    post_count = models.PositiveIntegerField(
+        "количество постов",
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -56,11 +61,23 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        "количество комментариев",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.text[:self.POSTMODELSTRLIMIT]
@@ -90,6 +107,12 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.text
 
@@ -117,3 +140,142 @@ class Follow(models.Model):
             models.CheckConstraint(check=~models.Q(author=models.F('user')),
                                    name='cant_follow_yourself'),
         ]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counters",
+        verbose_name="Пользователь",
+    )
+    posts = models.PositiveIntegerField("постов", default=0)
+    followers = models.PositiveIntegerField("подписчиков", default=0)
+    following = models.PositiveIntegerField("подписок", default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class Timeline(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Читатель",
+        help_text="пользователь, в ленту которого попал пост",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    pub_date = models.DateTimeField("дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_post'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_feed_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_author_idx'),
+        ]
+
+
+class OutboxEvent(models.Model):
+    POST = 'post'
+    COMMENT = 'comment'
+    # object_id - id подписчика, чьи подписки изменились
+    FOLLOWS = 'follows'
+    KINDS = (
+        (POST, 'пост'),
+        (COMMENT, 'комментарий'),
+        (FOLLOWS, 'подписки пользователя'),
+    )
+    SAVED = 'save'
+    DELETED = 'delete'
+    ACTIONS = (
+        (SAVED, 'сохранён'),
+        (DELETED, 'удалён'),
+    )
+    kind = models.CharField("объект", max_length=16, choices=KINDS)
+    object_id = models.PositiveIntegerField("id объекта")
+    action = models.CharField("действие", max_length=16, choices=ACTIONS)
+    created = models.DateTimeField("время изменения", auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Событие outbox'
+        verbose_name_plural = 'События outbox'
+
+
+class OutboxCheckpoint(models.Model):
+    consumer = models.CharField(
+        "обработчик",
+        max_length=64,
+        primary_key=True,
+    )
+    position = models.BigIntegerField(
+        "последнее обработанное событие",
+        default=0,
+    )
+    updated = models.DateTimeField("время обработки", auto_now=True)
+
+    class Meta:
+        verbose_name = 'Позиция обработчика outbox'
+        verbose_name_plural = 'Позиции обработчиков outbox'
+
+
+class RankedFeed(models.Model):
+    feed = models.CharField("лента", max_length=64, primary_key=True)
+    post_ids = models.TextField("id постов по убыванию оценки")
+    computed = models.DateTimeField("время расчёта")
+
+    class Meta:
+        verbose_name = 'Ранжированная лента'
+        verbose_name_plural = 'Ранжированные ленты'
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        verbose_name="Пользователь",
+        help_text="кому предлагается подписка",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+        help_text="на кого предлагается подписаться",
+    )
+    score = models.FloatField("оценка")
+
+    class Meta:
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='recommendation_user_idx'),
+        ]
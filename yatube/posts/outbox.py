@@ -0,0 +1,110 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from . import recommendations, search
+from .models import OutboxCheckpoint, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# обработчики производных индексов: тип объекта -> функция, получающая
+# id изменённых объектов пачки; функция сама читает их текущее состояние,
+# поэтому повторная доставка безопасна
+CONSUMERS = {
+    'search': {OutboxEvent.POST: search.reindex},
+    'recommendations': {OutboxEvent.FOLLOWS: recommendations.refresh},
+}
+
+
+def record(kind, object_id, action=OutboxEvent.SAVED):
+    """Записывает изменение в outbox в транзакции самого изменения."""
+    OutboxEvent.objects.create(kind=kind, object_id=object_id, action=action)
+
+
+def position(consumer):
+    return (OutboxCheckpoint.objects.filter(consumer=consumer)
+                                    .values_list('position', flat=True)
+                                    .first() or 0)
+
+
+def process_batch(consumer, batch_size=None):
+    """Применяет к индексам обработчика очередную пачку событий.
+
+    Позиция сдвигается после обработки, в одной транзакции с ней: если
+    обработчик упал, пачка будет доставлена снова (at-least-once).
+    События читаются по возрастанию id - SQLite выдаёт id в порядке
+    фиксации транзакций, поэтому событие не может появиться позади
+    уже сохранённой позиции.
+    """
+    events = (OutboxEvent.objects.filter(pk__gt=position(consumer))
+                                 .order_by('pk')
+                                 .values_list('pk', 'kind', 'object_id'))
+    events = list(events[:batch_size or settings.OUTBOX_BATCH_SIZE])
+    if not events:
+        return 0
+    changed = defaultdict(set)
+    for _, kind, object_id in events:
+        changed[kind].add(object_id)
+    with transaction.atomic():
+        for kind, handler in CONSUMERS[consumer].items():
+            if changed[kind]:
+                handler(sorted(changed[kind]))
+        OutboxCheckpoint.objects.update_or_create(
+            consumer=consumer, defaults={'position': events[-1][0]})
+    return len(events)
+
+
+def drain(consumers=None, batch_size=None):
+    """Обрабатывает все накопившиеся события и возвращает их число."""
+    done = 0
+    for consumer in consumers or CONSUMERS:
+        while True:
+            processed = process_batch(consumer, batch_size)
+            if not processed:
+                break
+            done += processed
+    return done
+
+
+def horizon():
+    """Позиция, до которой события обработаны всеми и могут быть удалены."""
+    positions = dict(OutboxCheckpoint.objects
+                                     .filter(consumer__in=list(CONSUMERS))
+                                     .values_list('consumer', 'position'))
+    return min(positions.get(consumer, 0) for consumer in CONSUMERS)
+
+
+def latest():
+    return (OutboxEvent.objects.order_by('-pk')
+                               .values_list('pk', flat=True).first() or 0)
+
+
+def prune(retention=None):
+    """Удаляет события, которые обработали все обработчики и которые
+    старше OUTBOX_RETENTION: их ещё дочитывают индексы в воркерах."""
+    retention = (settings.OUTBOX_RETENTION if retention is None
+                 else retention)
+    return OutboxEvent.objects.filter(
+        pk__lte=horizon(),
+        created__lte=timezone.now() - timedelta(seconds=retention),
+    ).delete()[0]
+
+
+def lag(consumer):
+    """Сколько событий ждёт обработчика и сколько секунд ждёт старейшее."""
+    pending = OutboxEvent.objects.filter(pk__gt=position(consumer))
+    oldest = pending.aggregate(oldest=Min('created'))['oldest']
+    return {
+        'pending': pending.count(),
+        'seconds': ((timezone.now() - oldest).total_seconds()
+                    if oldest is not None else 0.0),
+    }
+
+
+def lag_summary():
+    return {consumer: lag(consumer) for consumer in CONSUMERS}
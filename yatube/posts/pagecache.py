@@ -0,0 +1,122 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from core import metrics, routers
+
+GENERATION_PREFIX = 'feed-gen'
+WRITTEN_PREFIX = 'feed-written'
+FRAGMENT_PREFIX = 'feed-page'
+LOCK_POLL = 0.05
+
+
+def generation_key(feed):
+    return ':'.join(map(str, (GENERATION_PREFIX, *feed)))
+
+
+def generation(feed):
+    key = generation_key(feed)
+    value = cache.get(key)
+    if value is None:
+        # новое поколение не должно совпасть с вытесненным из кэша
+        value = time.time_ns()
+        if not cache.add(key, value, None):
+            value = cache.get(key)
+    return value
+
+
+def version(feeds):
+    """Общая версия нескольких лент: меняется с поколением любой из них
+    и с их набором. Поколения читаются одним get_many."""
+    keys = [generation_key(feed) for feed in feeds]
+    found = cache.get_many(keys)
+    generations = [found[key] if key in found else generation(feed)
+                   for key, feed in zip(keys, feeds)]
+    return hashlib.md5(repr(list(zip(feeds, generations))).encode()
+                       ).hexdigest()
+
+
+def written_key(feed):
+    return ':'.join(map(str, (WRITTEN_PREFIX, *feed)))
+
+
+def bump(*feeds):
+    for feed in feeds:
+        key = generation_key(feed)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    # пока реплика может отставать, фрагменты с неё не кэшируются
+    cache.set_many({written_key(feed): 1 for feed in feeds},
+                   settings.REPLICA_STICKY_SECONDS)
+
+
+def cacheable(feed):
+    """Можно ли сохранить фрагмент, построенный этим запросом: строки
+    с реплики вскоре после записи могут быть ещё старыми."""
+    return (not routers.reading_replica()
+            or cache.get(written_key(feed)) is None)
+
+
+def post_feeds(post, *group_ids):
+    feeds = [('index',), ('author', post.author_id), ('post', post.pk)]
+    feeds.extend(('group', group_id)
+                 for group_id in (post.group_id, *group_ids)
+                 if group_id is not None)
+    return feeds
+
+
+def fetch(name, feed, vary_on, render):
+    """Возвращает фрагмент страницы ленты из кэша или строит его.
+
+    Фрагмент действителен, пока не сменилось поколение ленты ``feed``
+    и не истёк FEED_CACHE_REFRESH. Перестраивает его только один запрос,
+    державший блокировку; остальные в это время получают прежнюю версию.
+    """
+    return ''.join(stream(name, feed, vary_on, lambda: [render()]))
+
+
+def stream(name, feed, vary_on, chunks):
+    """То же, что fetch, но по частям: при промахе части ``chunks()``
+    отдаются по мере построения и складываются в кэш в конце."""
+    key = make_template_fragment_key(f'{FRAGMENT_PREFIX}.{name}',
+                                     [*feed, *vary_on])
+    current = generation(feed)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == current and entry[1] > time.time():
+        metrics.cache_lookup(True)
+        yield entry[2]
+        return
+    lock = f'{key}:lock'
+    locked = cache.add(lock, 1, settings.FEED_CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            metrics.cache_lookup(True)
+            yield entry[2]
+            return
+        deadline = time.time() + settings.FEED_CACHE_LOCK_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None and entry[0] == current:
+                metrics.cache_lookup(True)
+                yield entry[2]
+                return
+    metrics.cache_lookup(False)
+    try:
+        parts = []
+        for part in chunks():
+            parts.append(part)
+            yield part
+        if cacheable(feed):
+            cache.set(key,
+                      (current, time.time() + settings.FEED_CACHE_REFRESH,
+                       ''.join(parts)),
+                      settings.FEED_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock)
@@ -0,0 +1,262 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from core import routers
+
+
+COUNT_KEY_PREFIX = 'feed-count'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def count_key(*parts):
+    return ':'.join(map(str, (COUNT_KEY_PREFIX, *parts)))
+
+
+def invalidate_counts(post, *group_ids):
+    keys = [count_key('index'), count_key('author', post.author_id)]
+    keys.extend(count_key('group', group_id)
+                for group_id in (post.group_id, *group_ids)
+                if group_id is not None)
+    cache.delete_many(keys)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт число объектов из кэша.
+
+    Для больших лент вместо COUNT(*) используется оценка ``estimate``
+    (например, денормализованный счётчик).
+    """
+
+    def __init__(self, object_list, per_page, cache_key=None, estimate=None,
+                 window=2, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+        self.estimate = estimate
+        self.window = window
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return super().count
+        count = cache.get(self.cache_key)
+        if count is None:
+            with routers.primary():
+                count = (self.estimate() if self.estimate is not None
+                         else None)
+                if (count is None
+                        or count < settings.PAGINATOR_ESTIMATE_THRESHOLD):
+                    count = super().count
+            cache.set(self.cache_key, count, settings.PAGINATOR_COUNT_TTL)
+        return count
+
+    def page(self, number):
+        page = super().page(number)
+        page.window = range(max(page.number - self.window, 1),
+                            min(page.number + self.window,
+                                self.num_pages) + 1)
+        return page
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (дата, id) без OFFSET и COUNT(*).
+
+    Каждая страница - это диапазон по индексу, начиная с позиции,
+    зашифрованной в непрозрачном токене ``?cursor=``.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page, key=('pub_date', 'pk'),
+                 descending=True):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.descending = descending
+
+    def _check_object_list_is_ordered(self):
+        # порядок задаёт slice() по ключу, свой у queryset не нужен
+        pass
+
+    def clean_cursor(self, cursor):
+        """Курсор, если он разбирается, иначе None, как в get_page()."""
+        if cursor is not None:
+            try:
+                self.decode_cursor(cursor)
+            except InvalidCursor:
+                return None
+        return cursor
+
+    def format_value(self, value):
+        return value.isoformat()
+
+    def parse_value(self, value):
+        return parse_datetime(value)
+
+    def encode_cursor(self, row, backwards=False):
+        # строки values() - словари, остальные - объекты моделей
+        value, pk = (row[field] if isinstance(row, dict)
+                     else getattr(row, field) for field in self.key)
+        direction = 'p' if backwards else 'n'
+        return urlsafe_base64_encode(force_bytes(
+            f'{direction}|{self.format_value(value)}|{pk}'))
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, value, pk = (urlsafe_base64_decode(cursor)
+                                    .decode().split('|'))
+            position = (self.parse_value(value), int(pk))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise InvalidCursor(cursor)
+        if direction not in ('n', 'p') or position[0] is None:
+            raise InvalidCursor(cursor)
+        return position, direction == 'p'
+
+    def slice(self, queryset, position=None, backwards=False, key=None):
+        field, tiebreak = key or self.key
+        descending = self.descending != backwards
+        if position is not None:
+            value, pk = position
+            lookup, tie_lookup = ('lte', 'gte') if descending else ('gte',
+                                                                    'lte')
+            queryset = (queryset.filter(**{f'{field}__{lookup}': value})
+                                .exclude(**{field: value,
+                                            f'{tiebreak}__{tie_lookup}': pk}))
+        sign = '-' if descending else ''
+        return queryset.order_by(f'{sign}{field}', f'{sign}{tiebreak}')
+
+    def page(self, cursor=None):
+        position, backwards = None, False
+        if cursor is not None:
+            position, backwards = self.decode_cursor(cursor)
+        rows = list(self.slice(self.object_list, position, backwards)
+                    [:self.per_page + 1])
+        return self.build_page(rows, cursor, position, backwards)
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+    def stream_page(self, cursor=None, chunk_size=None):
+        """Страница, строки которой читаются по мере обхода.
+
+        Назад по курсору строки приходят в обратном порядке, поэтому
+        такие страницы, как и неверный курсор, строятся обычным образом.
+        """
+        try:
+            position, backwards = (self.decode_cursor(cursor)
+                                   if cursor is not None else (None, False))
+        except InvalidCursor:
+            return self.page()
+        if backwards:
+            return self.page(cursor)
+        return StreamingPage(
+            self.slice(self.object_list, position)[:self.per_page + 1],
+            self, cursor, position,
+            chunk_size or settings.STREAMING_CHUNK_SIZE)
+
+    def build_page(self, rows, cursor, position, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        has_next = backwards or has_more
+        has_previous = has_more if backwards else position is not None
+        page = Page(rows, 1, self)
+        page.cursor = cursor
+        page.next_cursor = (self.encode_cursor(rows[-1])
+                            if rows and has_next else None)
+        page.previous_cursor = (self.encode_cursor(rows[0], backwards=True)
+                                if rows and has_previous else None)
+        return page
+
+
+class StreamingPage(Page):
+    """Страница CursorPaginator поверх ``queryset.iterator(chunk_size)``.
+
+    При обходе строки не копятся: курсоры считаются по первой и последней
+    строке, а ``chunk_hooks`` получают каждую пачку до её отрисовки.
+    Любое другое обращение к строкам (len, индекс, курсоры до обхода)
+    читает страницу целиком, как обычная.
+    """
+    streaming = True
+
+    def __init__(self, queryset, paginator, cursor, position, chunk_size):
+        self.queryset = queryset
+        self.paginator = paginator
+        self.number = 1
+        self.cursor = cursor
+        self.position = position
+        self.chunk_size = chunk_size
+        self.chunk_hooks = []
+        self.streamed = False
+
+    def __repr__(self):
+        return '<Streaming page>'
+
+    @cached_property
+    def object_list(self):
+        page = self.paginator.build_page(list(self.queryset), self.cursor,
+                                         self.position, False)
+        self.__dict__.update(next_cursor=page.next_cursor,
+                             previous_cursor=page.previous_cursor)
+        return page.object_list
+
+    def __getattr__(self, name):
+        # курсоры до обхода известны только по всей странице
+        if name in ('next_cursor', 'previous_cursor'):
+            self.object_list
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def __iter__(self):
+        if self.streamed or 'object_list' in self.__dict__:
+            yield from self.object_list
+            return
+        self.streamed = True
+        rows = self.queryset.iterator(chunk_size=self.chunk_size)
+        remaining = self.paginator.per_page
+        first = last = None
+        has_more = False
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            if len(chunk) > remaining:
+                has_more = True
+                chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            if chunk:
+                first = first if first is not None else chunk[0]
+                last = chunk[-1]
+                for hook in self.chunk_hooks:
+                    hook(chunk)
+                yield from chunk
+        encode = self.paginator.encode_cursor
+        self.next_cursor = (encode(last) if has_more else None)
+        self.previous_cursor = (encode(first, backwards=True)
+                                if first is not None
+                                and self.position is not None else None)
+
+
+class IdCursorPaginator(CursorPaginator):
+    """Постраничный вывод по ключу из одного id - для моделей без даты."""
+
+    def __init__(self, object_list, per_page, descending=True):
+        super().__init__(object_list, per_page, key=('pk', 'pk'),
+                         descending=descending)
+
+    def format_value(self, value):
+        return str(value)
+
+    def parse_value(self, value):
+        return int(value)
@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from . import pagecache
+from .models import Comment, Post, RankedFeed
+
+INDEX = 'index'
+CACHE_PREFIX = 'ranked-feed'
+
+# сигналы кандидатов, по массиву на сигнал в порядке ``ids``
+Features = namedtuple('Features', ('ids', 'age', 'comments', 'followers',
+                                   'group_posts'))
+
+
+def normalized(values):
+    """Приводит сигнал к [0, 1], чтобы веса были сравнимы."""
+    top = values.max() if values.size else 0
+    return values / top if top > 0 else np.zeros_like(values, dtype=float)
+
+
+class Engine(ABC):
+    """Движок ранжирования: по сигналам кандидатов возвращает оценки,
+    чем больше, тем выше пост в ленте."""
+
+    @abstractmethod
+    def score(self, features):
+        pass
+
+
+class WeightedEngine(Engine):
+    """Взвешенная сумма сигналов из RANKING_WEIGHTS.
+
+    Свежесть затухает вдвое за RANKING_HALF_LIFE часов, скорость
+    комментирования - комментарии в час за RANKING_VELOCITY_WINDOW,
+    подписчики автора и активность группы берутся в логарифме.
+    """
+
+    def __init__(self, weights=None, half_life=None, velocity_window=None):
+        self.weights = weights or settings.RANKING_WEIGHTS
+        self.half_life = half_life or settings.RANKING_HALF_LIFE
+        self.velocity_window = (velocity_window
+                                or settings.RANKING_VELOCITY_WINDOW)
+
+    def signals(self, features):
+        return {
+            'recency': np.exp2(-features.age / self.half_life),
+            'velocity': normalized(features.comments / self.velocity_window),
+            'followers': normalized(np.log1p(features.followers)),
+            'group': normalized(np.log1p(features.group_posts)),
+        }
+
+    def score(self, features):
+        signals = self.signals(features)
+        score = np.zeros(len(features.ids))
+        for name, weight in self.weights.items():
+            score += weight * signals[name]
+        return score
+
+
+def engine():
+    return import_string(settings.RANKING_ENGINE)()
+
+
+def features(now=None):
+    """Сигналы постов за последние RANKING_CANDIDATE_WINDOW часов:
+    два запроса, дальше только векторные операции."""
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.RANKING_CANDIDATE_WINDOW)
+    rows = list(Post.objects.filter(pub_date__gte=since)
+                            .order_by('pk')
+                            .values_list('pk', 'pub_date', 'group_id',
+                                         'author__counters__followers'))
+    count = len(rows)
+    ids = np.fromiter((row[0] for row in rows), np.int64, count)
+    published = np.fromiter((row[1].timestamp() for row in rows), float,
+                            count)
+    groups = np.fromiter((row[2] or 0 for row in rows), np.int64, count)
+    followers = np.fromiter((row[3] or 0 for row in rows), float, count)
+    commented = np.array(
+        Comment.objects.filter(
+            post__pub_date__gte=since,
+            created__gte=now - timedelta(
+                hours=settings.RANKING_VELOCITY_WINDOW),
+        ).values_list('post_id', flat=True), dtype=np.int64)
+    # ids отсортированы, поэтому позиция поста находится бинарным поиском;
+    # пост, опубликованный между двумя запросами, пропускаем
+    positions = np.searchsorted(ids, commented)
+    known = positions < count
+    known[known] = ids[positions[known]] == commented[known]
+    comments = np.bincount(positions[known], minlength=count).astype(float)
+    group_posts = np.bincount(groups)[groups].astype(float)
+    group_posts[groups == 0] = 0
+    return Features(ids, (now.timestamp() - published) / 3600, comments,
+                    followers, group_posts)
+
+
+def top(ids, scores, k):
+    """``k`` лучших id по убыванию оценки, при равенстве - новые выше."""
+    if len(ids) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[best], scores[best]
+    return ids[np.lexsort((-ids, -scores))]
+
+
+def rank(now=None, k=None):
+    """Пересчитывает главную ленту и сохраняет её первые ``k`` постов."""
+    # время до чтения кандидатов: всё, что опубликовано позже, ranked_ids
+    # покажет как свежее
+    computed = timezone.now()
+    found = features(now)
+    ids = top(found.ids, engine().score(found), k or settings.RANKING_TOP_K)
+    ids = ids.tolist()
+    RankedFeed.objects.update_or_create(feed=INDEX, defaults={
+        'post_ids': ','.join(map(str, ids)),
+        'computed': computed,
+    })
+    cache.set(cache_key(INDEX), (ids, computed), settings.FEED_CACHE_REFRESH)
+    pagecache.bump((INDEX,))
+    return ids
+
+
+def cache_key(feed):
+    return f'{CACHE_PREFIX}:{feed}'
+
+
+def fresh_ids(feed, since):
+    """id постов новее пересчёта, от новых к старым. Кэшируются до
+    следующего поста: он меняет поколение ленты."""
+    key = f'{cache_key(feed)}:fresh:{pagecache.generation((feed,))}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(Post.objects.filter(pub_date__gt=since)
+                               .order_by('-pub_date', '-pk')
+                               .values_list('pk', flat=True)
+                   [:settings.RANKING_TOP_K])
+        cache.set(key, ids, settings.FEED_CACHE_REFRESH)
+    return ids
+
+
+def ranked_ids(feed=INDEX):
+    """Готовый список id ленты или None, если его ещё не считали.
+
+    Список берётся из кэша, а при промахе - одним чтением из базы.
+    Посты, опубликованные после пересчёта, стоят первыми, чтобы не
+    ждать следующего запуска rank_feeds.
+    """
+    ranked = cache.get(cache_key(feed))
+    if ranked is None:
+        stored, computed = (RankedFeed.objects.filter(feed=feed)
+                                              .values_list('post_ids',
+                                                           'computed')
+                                              .first() or ('', None))
+        # пустой список в кэше означает «рейтинга нет»
+        ranked = [int(pk) for pk in stored.split(',') if pk], computed
+        cache.set(cache_key(feed), ranked, settings.FEED_CACHE_REFRESH)
+    ids, computed = ranked
+    if not ids:
+        return None
+    fresh = fresh_ids(feed, computed)
+    if not fresh:
+        return ids
+    seen = set(fresh)
+    return fresh + [pk for pk in ids if pk not in seen]
+
+
+class RankedPosts:
+    """Последовательность постов по готовому списку id для Paginator:
+    посты страницы подгружаются одним запросом."""
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    @cached_property
+    def live_ids(self):
+        """Id списка без постов, удалённых после пересчёта: иначе они
+        попадали бы в число постов и укорачивали страницы."""
+        existing = set(self.queryset.filter(pk__in=self.ids)
+                                    .values_list('pk', flat=True))
+        return [pk for pk in self.ids if pk in existing]
+
+    def count(self):
+        return len(self.live_ids)
+
+    def __len__(self):
+        return len(self.live_ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.live_ids[index]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,150 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import pagecache
+from .conditional import SUGGESTIONS
+from .models import Follow, Recommendation, User, UserCounters
+
+
+def csr(rows, columns, size):
+    """Разреженная матрица смежности в формате CSR: соседи вершины ``i`` -
+    ``indices[indptr[i]:indptr[i + 1]]``."""
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns[np.argsort(rows, kind='stable')]
+
+
+def gather(matrix, ids):
+    """Соседи всех вершин ``ids`` одним массивом и их число у каждой."""
+    indptr, indices = matrix
+    starts = indptr[ids]
+    lengths = indptr[ids + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(lengths.sum())], lengths
+
+
+class Graph:
+    """Граф подписок ``Follow(user, author)``: матрица «на кого подписан»
+    и транспонированная к ней «кто подписан»."""
+
+    def __init__(self, edges):
+        edges = np.array(list(edges), dtype=np.int64).reshape(-1, 2)
+        users, authors = edges[:, 0], edges[:, 1]
+        size = int(edges.max()) + 1 if edges.size else 0
+        self.size = size
+        self.following = csr(users, authors, size)
+        self.followers = csr(authors, users, size)
+
+    @classmethod
+    def around(cls, user_id):
+        """Подграф, которого достаточно для рекомендаций одному
+        пользователю: его подписки, подписки его авторов и всех, кто
+        читает тех же авторов."""
+        authors = Follow.objects.filter(user=user_id).values('author')
+        peers = Follow.objects.filter(author__in=authors).values('user')
+        return cls(Follow.objects.filter(
+            Q(user=user_id) | Q(user__in=authors) | Q(user__in=peers),
+        ).values_list('user', 'author'))
+
+    def suggest(self, user_id, weights=None):
+        """Кандидаты в авторы для ``user_id`` и их оценки.
+
+        Друзья друзей дают по весу за каждого своего автора, который на
+        них подписан; похожие читатели - косинусную близость своих
+        подписок к подпискам пользователя за каждого своего автора.
+        """
+        weights = weights or settings.RECOMMENDATION_WEIGHTS
+        if user_id >= self.size:
+            return np.empty(0, np.int64), np.empty(0)
+        follows, _ = gather(self.following, np.array([user_id]))
+        if not follows.size:
+            return np.empty(0, np.int64), np.empty(0)
+        friends, _ = gather(self.following, follows)
+        similar, _ = gather(self.followers, follows)
+        peers, common = np.unique(similar[similar != user_id],
+                                  return_counts=True)
+        degrees = np.diff(self.following[0])[peers]
+        closeness = common / np.sqrt(follows.size * degrees)
+        theirs, lengths = gather(self.following, peers)
+        candidates, inverse = np.unique(np.concatenate((friends, theirs)),
+                                        return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate((
+            np.full(friends.size, weights['friends_of_friends']),
+            weights['co_follow'] * np.repeat(closeness, lengths),
+        )), minlength=candidates.size)
+        keep = ((candidates != user_id)
+                & ~np.isin(candidates, follows) & (scores > 0))
+        return candidates[keep], scores[keep]
+
+
+def best(candidates, scores, count):
+    """``count`` лучших кандидатов, при равенстве - с меньшим id."""
+    if candidates.size > count:
+        top = np.argpartition(-scores, count - 1)[:count]
+        candidates, scores = candidates[top], scores[top]
+    order = np.lexsort((candidates, -scores))
+    return candidates[order], scores[order]
+
+
+def popular(count):
+    """Самые читаемые авторы - для тех, кто ещё ни на кого не подписан."""
+    authors = (UserCounters.objects.filter(followers__gt=0)
+                                   .order_by('-followers', 'user_id')
+                                   .values_list('user_id', 'followers'))
+    return list(authors[:count + 1])
+
+
+def recommend(graph, user_id, fallback, count):
+    candidates, scores = best(*graph.suggest(user_id), count)
+    found = list(zip(candidates.tolist(), scores.tolist()))
+    if not found:
+        found = [(author_id, float(followers))
+                 for author_id, followers in fallback
+                 if author_id != user_id][:count]
+    return [Recommendation(user_id=user_id, author_id=author_id, score=score)
+            for author_id, score in found]
+
+
+def store(user_ids, recommendations):
+    with transaction.atomic():
+        Recommendation.objects.filter(user__in=user_ids).delete()
+        Recommendation.objects.bulk_create(recommendations)
+    pagecache.bump(SUGGESTIONS)
+
+
+def refresh(user_ids, count=None):
+    """Пересчитывает рекомендации пользователей, чьи подписки
+    изменились, по их окрестности графа."""
+    count = count or settings.RECOMMENDATIONS_TOP_N
+    fallback = popular(count)
+    store(user_ids, [recommendation for user_id in user_ids
+                     for recommendation in recommend(
+                         Graph.around(user_id), user_id, fallback, count)])
+
+
+def rebuild(count=None):
+    """Пересчитывает рекомендации всех пользователей по всему графу."""
+    count = count or settings.RECOMMENDATIONS_TOP_N
+    graph = Graph(Follow.objects.values_list('user', 'author'))
+    fallback = popular(count)
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    recommendations = [recommendation for user_id in user_ids
+                       for recommendation in recommend(
+                           graph, user_id, fallback, count)]
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        Recommendation.objects.bulk_create(recommendations)
+    pagecache.bump(SUGGESTIONS)
+    return len(recommendations)
+
+
+def for_user(user):
+    """Предложения пользователю одним чтением по индексу."""
+    if not user.is_authenticated:
+        return []
+    suggestions = (Recommendation.objects.filter(user=user)
+                                         .select_related('author')
+                                         .order_by('-score'))
+    return list(suggestions[:settings.RECOMMENDATIONS_TOP_N])
@@ -0,0 +1,213 @@
+import re
+from functools import lru_cache
+from itertools import islice
+
+from django.db import connection
+
+from .models import Post
+
+TABLE = 'posts_search'
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]+')
+# столько строк индекса вставляется одним executemany
+CHUNK_SIZE = 2000
+# столько основ слов помнит stem(): словарь постов намного меньше текста
+STEM_CACHE_SIZE = 2 ** 16
+
+
+def _endings(*groups):
+    """Окончания групп от длинных к коротким с флагом группы: перед
+    окончанием должна стоять «а» или «я», которая остаётся в основе."""
+    return sorted(((ending, after_a) for after_a, endings in groups
+                   for ending in endings),
+                  key=lambda item: -len(item[0]))
+
+
+# окончания русского стеммера Snowball
+PERFECTIVE_GERUND = _endings(
+    (True, ('в', 'вши', 'вшись')),
+    (False, ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись')),
+)
+ADJECTIVE = _endings((False, (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)))
+PARTICIPLE = _endings(
+    (True, ('ем', 'нн', 'вш', 'ющ', 'щ')),
+    (False, ('ивш', 'ывш', 'ующ')),
+)
+REFLEXIVE = _endings((False, ('ся', 'сь')))
+VERB = _endings(
+    (True, ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло',
+            'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно')),
+    (False, ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли',
+             'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено',
+             'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь',
+             'ую', 'ю')),
+)
+NOUN = _endings((False, (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+)))
+SUPERLATIVE = _endings((False, ('ейш', 'ейше')))
+DERIVATIONAL = _endings((False, ('ост', 'ость')))
+
+
+def _region(word, start=0):
+    """Начало области после первой пары «гласная, согласная»."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, start, endings):
+    """Отрезает самое длинное окончание, лежащее в области ``start``.
+
+    Возвращает None, если окончания нет или не выполнено условие группы.
+    """
+    for ending, after_a in endings:
+        if not word.endswith(ending):
+            continue
+        stem = word[:-len(ending)]
+        if len(stem) < start:
+            continue
+        if after_a and not (stem[-1:] in ('а', 'я') and len(stem) > start):
+            return None
+        return stem
+    return None
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """Основа слова по русскому стеммеру Snowball."""
+    rv = next((i + 1 for i, char in enumerate(word) if char in VOWELS),
+              len(word))
+    r2 = _region(word, _region(word))
+    result = _strip(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        result = _strip(word, rv, ADJECTIVE)
+        if result is not None:
+            result = _strip(result, rv, PARTICIPLE) or result
+        else:
+            result = (_strip(word, rv, VERB) or _strip(word, rv, NOUN)
+                      or word)
+    word = result
+    if word.endswith('и') and len(word) > rv:
+        word = word[:-1]
+    word = _strip(word, r2, DERIVATIONAL) or word
+    if word.endswith('нн'):
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        return superlative[:-1] if superlative.endswith('нн') else superlative
+    if word.endswith('ь'):
+        return word[:-1]
+    return word
+
+
+def tokens(text):
+    """Слова текста в нижнем регистре; русские приводятся к основе."""
+    return [stem(word) if CYRILLIC.fullmatch(word) else word
+            for word in WORD.findall(text.lower().replace('ё', 'е'))]
+
+
+def match_expression(query):
+    """Запрос FTS5: все слова запроса, каждое в кавычках."""
+    words = dict.fromkeys(tokens(query))
+    return ' AND '.join(f'"{word}"' for word in words) or None
+
+
+def insert(cursor, posts):
+    """Вставляет записи индекса для пар (pk, текст) пачками.
+
+    Посты должны идти по возрастанию pk: FTS5 копит новые записи в памяти
+    и сбрасывает их на диск, как только rowid оказывается меньше
+    предыдущего, - в порядке ленты вставка шла в десятки раз медленнее.
+    """
+    posts = iter(posts)
+    while True:
+        chunk = [(pk, ' '.join(tokens(text)))
+                 for pk, text in islice(posts, CHUNK_SIZE)]
+        if not chunk:
+            break
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, body) VALUES (%s, %s)', chunk)
+
+
+def reindex(pks):
+    """Обновляет записи индекса для постов ``pks``; удалённых постов
+    в индексе не остаётся."""
+    posts = (Post.objects.filter(pk__in=pks).order_by('pk')
+                         .values_list('pk', 'text'))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                           [(pk,) for pk in pks])
+        insert(cursor, posts)
+
+
+def rebuild():
+    """Заново строит индекс по всем постам."""
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        insert(cursor, posts.iterator(chunk_size=CHUNK_SIZE))
+
+
+def matching(queryset, query):
+    """Ограничивает ``queryset`` постами, подходящими под запрос."""
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    # RawSQL в pk__in дал бы IN ((SELECT ...)), а SQLite читает такой
+    # подзапрос как скалярный и берёт из него только первую строку
+    column = f'{Post._meta.db_table}.{Post._meta.pk.column}'
+    return queryset.extra(
+        where=[f'{column} IN (SELECT rowid FROM {TABLE} '
+               f'WHERE {TABLE} MATCH %s)'],
+        params=[expression])
+
+
+class SearchResults:
+    """Найденные посты по убыванию релевантности (BM25).
+
+    Ведёт себя как последовательность для Paginator: ``count()`` и срезы
+    выполняются по индексу, а посты страницы подгружаются одним запросом.
+    """
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+
+    def count(self):
+        if self.expression is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {TABLE} WHERE {TABLE} MATCH %s',
+                [self.expression])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if self.expression is None:
+            return []
+        start = index.start or 0
+        limit = -1 if index.stop is None else index.stop - start
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+                'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [self.expression, limit, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = (Post.objects.select_related('group', 'author')
+                             .in_bulk(ids))
+        return [posts[pk] for pk in ids if pk in posts]
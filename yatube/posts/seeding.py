@@ -0,0 +1,264 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate, islice, repeat
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from . import search, timeline
+from .counters import recount
+from .models import Comment, Follow, Group, Post, Timeline, User
+
+BATCH_SIZE = 5000
+PASSWORD = 'yatube-seed'
+# столько разных картинок делим между всеми постами с картинкой
+IMAGE_VARIANTS = 16
+# страниц кэша SQLite на время загрузки, отрицательное значение - в КиБ
+LOAD_CACHE_SIZE = -256 * 1024
+
+
+def copy(model, fields, rows, batch_size=BATCH_SIZE, ignore_conflicts=False):
+    """Загружает кортежи значений пачками через executemany.
+
+    Аналог COPY: объекты моделей не создаются, поэтому значения должны
+    быть уже готовы для базы, а сигналы и значения по умолчанию
+    не срабатывают. Возвращает id новых строк по возрастанию.
+    """
+    ops = connection.ops
+    opts = model._meta
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    columns = ', '.join(ops.quote_name(opts.get_field(name).column)
+                        for name in fields)
+    sql = (f'{ops.insert_statement(ignore_conflicts=ignore_conflicts)} '
+           f'{ops.quote_name(opts.db_table)} ({columns}) '
+           f'VALUES ({", ".join(["%s"] * len(fields))}) '
+           f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts)}')
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            cursor.executemany(sql, batch)
+    return list(model.objects.filter(pk__gt=last or 0)
+                             .order_by('pk')
+                             .values_list('pk', flat=True))
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Убирает вторичные индексы таблиц на время загрузки и строит их
+    заново в конце, как create_model откладывает их после CREATE TABLE:
+    один проход сортировки быстрее вставки в индекс по строке."""
+    editor = connection.schema_editor()
+    statements = [statement for model in models
+                  for statement in editor._model_indexes_sql(model)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'PRAGMA cache_size = {LOAD_CACHE_SIZE}')
+        for statement in statements:
+            cursor.execute(editor.sql_delete_index % {
+                'name': statement.parts['name']})
+        yield
+        for statement in statements:
+            cursor.execute(str(statement))
+
+
+def next_pk(model):
+    return (model.objects.order_by('-pk')
+                         .values_list('pk', flat=True).first() or 0) + 1
+
+
+class Seeder:
+    """Быстро наполняет базу пользователями, группами, постами,
+    комментариями и подписками.
+
+    Популярность авторов подчиняется степенному закону: у k-го по
+    популярности автора в ``1 / k ** exponent`` раз меньше подписчиков
+    и постов, чем у первого. При одинаковом ``seed`` получаются те же
+    связи и тексты, даты отсчитываются от момента запуска.
+    """
+
+    def __init__(self, seed=0, days=365, exponent=1.0, images=0.0,
+                 batch_size=BATCH_SIZE):
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+        self.span = days * 24 * 60 * 60
+        self.exponent = exponent
+        self.images = images
+        self.batch_size = batch_size
+        # секунды по этапам последнего run(): загрузка и пересчёт
+        self.timings = {}
+
+    def moments(self, count):
+        """Возрастающие даты за последние ``days`` дней, уже в виде для
+        базы: строки идут в индексы по порядку, как при обычной работе."""
+        offsets = sorted((self.random.random() for _ in range(count)),
+                         reverse=True)
+        now, span = self.now, self.span
+        if connection.features.supports_timezones:
+            for offset in offsets:
+                yield now - timedelta(seconds=offset * span)
+            return
+        if timezone.is_aware(now):
+            now = timezone.make_naive(now, connection.timezone)
+        # то же, что adapt_datetimefield_value, без проверок на каждой строке
+        for offset in offsets:
+            yield (now - timedelta(seconds=offset * span)).isoformat(' ')
+
+    def ranked(self, ids):
+        """Перемешивает ``ids`` и возвращает их с накопленными весами."""
+        ids = list(ids)
+        self.random.shuffle(ids)
+        return ids, list(accumulate(rank ** -self.exponent
+                                    for rank in range(1, len(ids) + 1)))
+
+    def popular(self, ranked, count):
+        ids, weights = ranked
+        return self.random.choices(ids, cum_weights=weights, k=count)
+
+    def image_names(self):
+        if not self.images:
+            return []
+        names = []
+        for variant in range(IMAGE_VARIANTS):
+            name = f'posts/seed-{variant}.png'
+            if not default_storage.exists(name):
+                content = BytesIO()
+                color = tuple(self.random.randrange(256) for _ in range(3))
+                Image.new('RGB', (960, 540), color).save(content, 'PNG')
+                name = default_storage.save(name, ContentFile(
+                    content.getvalue()))
+            names.append(name)
+        return names
+
+    def users(self, count):
+        first = next_pk(User)
+        password = make_password(PASSWORD)
+        joined = next(self.moments(1))
+        return copy(User, (
+            'username', 'password', 'first_name', 'last_name', 'email',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined',
+        ), (
+            (f'seed{first + i}', password, 'Пользователь', str(first + i),
+             '', False, False, True, joined)
+            for i in range(count)
+        ), self.batch_size)
+
+    def groups(self, count):
+        first = next_pk(Group)
+        return copy(Group, ('title', 'slug', 'description', 'post_count'), (
+            (f'Группа {first + i}', f'seed-{first + i}',
+             'Группа для нагрузочных тестов', 0)
+            for i in range(count)
+        ), self.batch_size)
+
+    def posts(self, count, author_ids, group_ids):
+        authors = self.ranked(author_ids)
+        images = self.image_names()
+        moments = self.moments(count)
+        rnd = self.random
+
+        def rows():
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                groups = [rnd.choice(group_ids) if rnd.random() < .5 else None
+                          for _ in range(size)] if group_ids else [None] * size
+                pictures = [rnd.choice(images) if rnd.random() < self.images
+                            else '' for _ in range(size)] if images else (
+                    [''] * size)
+                yield from zip(
+                    [f'Тестовый пост {i}' for i in range(start, start + size)],
+                    islice(moments, size), self.popular(authors, size),
+                    groups, pictures, repeat(0))
+
+        return copy(Post, ('text', 'pub_date', 'author', 'group', 'image',
+                           'comment_count'), rows(), self.batch_size)
+
+    def comments(self, count, post_ids, author_ids):
+        choices = self.random.choices
+        moments = self.moments(count)
+
+        def rows():
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                yield from zip(
+                    choices(post_ids, k=size), choices(author_ids, k=size),
+                    [f'Комментарий {i}' for i in range(start, start + size)],
+                    islice(moments, size))
+
+        return copy(Comment, ('post', 'author', 'text', 'created'), rows(),
+                    self.batch_size)
+
+    def follow_edges(self, count, user_ids):
+        count = min(count, len(user_ids) * (len(user_ids) - 1))
+        authors = self.ranked(user_ids)
+        edges = set()
+        attempts = 0
+        while len(edges) < count:
+            if attempts > 20 * count:
+                # популярные авторы исчерпаны - добираем равномерно
+                edges.add(tuple(self.random.sample(user_ids, 2)))
+                continue
+            size = min(self.batch_size, count - len(edges))
+            attempts += size
+            for user_id, author_id in zip(
+                    self.random.choices(user_ids, k=size),
+                    self.popular(authors, size)):
+                if user_id != author_id:
+                    edges.add((user_id, author_id))
+        return edges
+
+    def follows(self, count, user_ids):
+        return copy(Follow, ('user', 'author'),
+                    self.follow_edges(count, user_ids), self.batch_size,
+                    ignore_conflicts=True)
+
+    def run(self, users=0, groups=0, posts=0, comments=0, follows=0,
+            search_index=True):
+        """Создаёт данные в одной транзакции и пересчитывает то, что
+        обычно поддерживают сигналы: счётчики, ленты подписок и, если
+        ``search_index``, поисковый индекс.
+
+        Как и loaddata, внешние ключи проверяются один раз в конце,
+        а не при вставке каждой строки. Время загрузки (вставка, индексы
+        и проверка ключей) и пересчёта остаётся в ``timings``.
+        """
+        with connection.constraint_checks_disabled(), transaction.atomic():
+            started = time.perf_counter()
+            with deferred_indexes(Post, Comment, Follow):
+                self.load(users, groups, posts, comments, follows)
+            connection.check_constraints(table_names=[
+                model._meta.db_table for model in (Post, Comment, Follow)])
+            loaded = time.perf_counter()
+            # пересчёт опирается на индексы, поэтому идёт после них
+            recount()
+            with deferred_indexes(Timeline):
+                timeline.rebuild()
+            if search_index:
+                search.rebuild()
+            self.timings = {'load': loaded - started,
+                            'rebuild': time.perf_counter() - loaded}
+
+    def load(self, users, groups, posts, comments, follows):
+        user_ids = self.users(users) or list(
+            User.objects.values_list('pk', flat=True))
+        group_ids = self.groups(groups) or list(
+            Group.objects.values_list('pk', flat=True))
+        post_ids = []
+        if posts and user_ids:
+            post_ids = self.posts(posts, user_ids, group_ids)
+        if comments and user_ids:
+            post_ids = post_ids or list(
+                Post.objects.values_list('pk', flat=True))
+            if post_ids:
+                self.comments(comments, post_ids, user_ids)
+        if follows and len(user_ids) > 1:
+            self.follows(follows, user_ids)
@@ -0,0 +1,95 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (counters, followgraph, follows, mergefeed, outbox, pagecache,
+               thumbnails, timeline)
+from .conditional import FOLLOWERS
+from .paginators import invalidate_counts
+from .models import Comment, Follow, OutboxEvent, Post, User, UserCounters
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_loaded(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = instance._previous_image = None
+    if instance.pk is not None and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk)
+                        .values_list('group_id', 'image')
+                        .first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_group_id = instance._previous_group_id
+    if created:
+        timeline.fan_out(instance)
+        counters.bump_user(instance.author_id, posts=1)
+        counters.bump_group(instance.group_id, 1)
+        invalidate_counts(instance)
+        mergefeed.invalidate(instance.author_id)
+    elif instance.group_id != previous_group_id:
+        counters.bump_group(previous_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+        invalidate_counts(instance, previous_group_id)
+    if instance.image and instance.image.name != instance._previous_image:
+        thumbnails.schedule(instance.image.name)
+    outbox.record(OutboxEvent.POST, instance.pk)
+    pagecache.bump(*pagecache.post_feeds(instance, previous_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts=-1)
+    counters.bump_group(instance.group_id, -1)
+    invalidate_counts(instance)
+    mergefeed.invalidate(instance.author_id)
+    outbox.record(OutboxEvent.POST, instance.pk, OutboxEvent.DELETED)
+    pagecache.bump(*pagecache.post_feeds(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_post(instance.post_id, 1)
+    outbox.record(OutboxEvent.COMMENT, instance.pk)
+    pagecache.bump(('post', instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    outbox.record(OutboxEvent.COMMENT, instance.pk, OutboxEvent.DELETED)
+    pagecache.bump(('post', instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.follow_added(instance)
+        counters.bump_user(instance.author_id, followers=1)
+        counters.bump_user(instance.user_id, following=1)
+        outbox.record(OutboxEvent.FOLLOWS, instance.user_id)
+        pagecache.bump((FOLLOWERS, instance.author_id))
+        follows.invalidate(instance.user_id)
+        followgraph.changed(instance.user_id, instance.author_id, True)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.follow_removed(instance)
+    counters.bump_user(instance.author_id, followers=-1)
+    counters.bump_user(instance.user_id, following=-1)
+    outbox.record(OutboxEvent.FOLLOWS, instance.user_id)
+    pagecache.bump((FOLLOWERS, instance.author_id))
+    follows.invalidate(instance.user_id)
+    followgraph.changed(instance.user_id, instance.author_id, False)
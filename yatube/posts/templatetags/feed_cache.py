@@ -0,0 +1,53 @@
+from django import template
+
+from core.streaming import iter_nodes
+
+from ..pagecache import fetch, stream
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, name, feed, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.feed = feed
+        self.vary_on = vary_on
+
+    def render(self, context):
+        return fetch(
+            self.name.resolve(context),
+            self.feed.resolve(context),
+            [var.resolve(context) for var in self.vary_on],
+            lambda: self.nodelist.render(context),
+        )
+
+    def stream(self, context):
+        return stream(
+            self.name.resolve(context),
+            self.feed.resolve(context),
+            [var.resolve(context) for var in self.vary_on],
+            lambda: iter_nodes(self.nodelist, context),
+        )
+
+
+@register.tag('feedcache')
+def do_feed_cache(parser, token):
+    """
+    Кэширует фрагмент ленты до смены её поколения.
+
+    Использование::
+
+        {% load feed_cache %}
+        {% feedcache 'index' feed page_obj.number page_obj.cursor %}
+            .. фрагмент ..
+        {% endfeedcache %}
+    """
+    nodelist = parser.parse(('endfeedcache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 2 arguments.")
+    name, feed, *vary_on = (parser.compile_filter(bit) for bit in bits[1:])
+    return FeedCacheNode(nodelist, name, feed, vary_on)
@@ -0,0 +1,32 @@
+from django import template
+
+from ..thumbnails import prefetch
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(page_obj, geometry_string, **options):
+    """
+    Готовит миниатюры всех постов страницы одним обращением к хранилищу.
+
+    Использование::
+
+        {% load thumbnail_batch %}
+        {% prefetch_thumbnails page_obj "100x100" crop="center" %}
+
+    Строки потоковой страницы ещё не прочитаны, поэтому для неё
+    миниатюры готовятся по пачкам, по мере чтения.
+    """
+    if getattr(page_obj, 'streaming', False):
+        page_obj.thumbnail_lookups_saved = 0
+
+        def prefetch_chunk(posts):
+            page_obj.thumbnail_lookups_saved += prefetch(
+                (post.image for post in posts), geometry_string, **options)
+
+        page_obj.chunk_hooks.append(prefetch_chunk)
+        return ''
+    page_obj.thumbnail_lookups_saved = prefetch(
+        (post.image for post in page_obj), geometry_string, **options)
+    return ''
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+from core.testing import QueryBudgetMixin
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# не больше стольких SQL-запросов на страницу при холодном кэше; ленты
+# и страница поста сначала читают состояние для ETag
+BUDGETS = {
+    # плюс чтение готового рейтинга ленты
+    'posts:index': 5,
+    'posts:group_list': 5,
+    # профиль и лента подписок читают ещё и рекомендации «кого читать»
+    'posts:profile': 7,
+    # и подписки зрителя для кнопки «подписаться на автора»
+    'posts:post_detail': 6,
+    'posts:follow_index': 5,
+    'posts:search': 5,
+}
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                           text=f'Тестовый пост {i}')
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_query_budgets(self):
+        """Страницы укладываются в бюджет SQL-запросов"""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse('posts:group_list',
+                                        kwargs={'slug': self.group.slug}),
+            'posts:profile': reverse('posts:profile',
+                                     kwargs={'username': self.author}),
+            'posts:post_detail': reverse('posts:post_detail',
+                                         kwargs={'post_id': self.post.pk}),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:search': reverse('posts:search') + '?q=посты',
+        }
+        for view_name, budget in BUDGETS.items():
+            with self.subTest(view_name=view_name):
+                self.assertQueryBudget(view_name, urls[view_name], budget)
+
+    def test_cache_hits_are_recorded(self):
+        """Повторный запрос берёт ленту из кэша"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        cold = metrics.last('posts:index')
+        self.client.get(url)
+        warm = metrics.last('posts:index')
+        self.assertEqual((cold.cache_hits, cold.cache_misses), (0, 1))
+        self.assertEqual((warm.cache_hits, warm.cache_misses), (1, 0))
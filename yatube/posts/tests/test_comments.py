@@ -0,0 +1,88 @@
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTLIMIT=5)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+        for i in range(12):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {i}')
+        cls.expected = list(cls.post.comments.order_by('created', 'pk'))
+        cls.url = reverse('posts:post_detail',
+                          kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_first_page(self):
+        """На странице поста только первая страница комментариев"""
+        response = self.client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.expected[:5])
+        self.assertContains(response, comments.next_cursor)
+
+    def test_fragment_endpoint_walks_all_comments(self):
+        """JSON-фрагменты догружают остальные комментарии по порядку"""
+        comments = self.client.get(self.url).context['comments']
+        cursor, texts = comments.next_cursor, []
+        while cursor:
+            data = self.client.get(
+                reverse('posts:post_comments',
+                        kwargs={'post_id': self.post.pk}),
+                {'cursor': cursor}).json()
+            texts.extend(comment.text for comment in self.expected
+                         if f'{comment.text}\n' in data['html'])
+            cursor = data['next_cursor']
+        self.assertEqual(texts, [comment.text
+                                 for comment in self.expected[5:]])
+
+    def comments_queried(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        # валидатор страницы читает дату последнего комментария
+        # подзапросом, а страница комментариев - саму таблицу
+        return any(query['sql'].startswith('SELECT "posts_comment"')
+                   for query in context.captured_queries)
+
+    def test_first_page_is_cached_until_new_comment(self):
+        """Первая страница берётся из кэша, пока не добавлен комментарий"""
+        self.assertTrue(self.comments_queried())
+        self.assertFalse(self.comments_queried())
+        self.client.force_login(self.author)
+        self.client.post(reverse('posts:add_comment',
+                                 kwargs={'post_id': self.post.pk}),
+                         {'text': 'Свежий комментарий'})
+        self.assertTrue(self.comments_queried())
+
+    def test_invalid_cursor_shares_first_page_cache(self):
+        """Неразборчивый ?comments= не заводит своих записей в кэше"""
+        self.assertTrue(self.comments_queried())
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'comments': 'мусор'})
+        self.assertFalse(any(query['sql'].startswith('SELECT "posts_comment"')
+                             for query in context.captured_queries))
+        self.assertEqual(response.context['comments_cursor'], None)
+
+    def test_no_unordered_warning(self):
+        """Пагинатор комментариев не предупреждает о неупорядоченном
+        queryset"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            self.client.get(self.url)
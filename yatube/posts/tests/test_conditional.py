@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_repeat_request_is_not_modified(self):
+        """Повторный запрос получает 304 за один SQL-запрос"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(1):
+                    repeat = self.revalidate(url, response)
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.content, b'')
+
+    def test_validated_by_etag_only(self):
+        """Страницы личные и перепроверяются, If-Modified-Since не даёт
+        304"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotIn('Last-Modified', response)
+                for header in ('private', 'no-cache'):
+                    self.assertIn(header, response['Cache-Control'])
+                repeat = self.revalidate(url, response)
+                self.assertIn('no-cache', repeat['Cache-Control'])
+                repeat = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 '
+                                                'GMT')
+                self.assertEqual(repeat.status_code, 200)
+
+    def test_changes_refresh_validator(self):
+        """Новый пост, правка, комментарий и подписка меняют ETag"""
+        responses = {url: self.client.get(url) for url in self.urls}
+        Post.objects.create(author=self.author, group=self.group,
+                            text='Ещё пост')
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(url, responses[url]).status_code, 200)
+        url = self.urls[3]
+        response = self.client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        response = self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        reader = Client()
+        reader.force_login(self.reader)
+        url = self.urls[2]
+        response = reader.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.revalidate(url, response, reader).status_code,
+                         200)
+
+    def test_validator_depends_on_page_and_user(self):
+        """Другая страница или другой пользователь не получают 304"""
+        url = self.urls[0]
+        response = self.client.get(url)
+        other_page = self.client.get(url + '?sort=new',
+                                     HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(other_page.status_code, 200)
+        reader = Client()
+        reader.force_login(self.reader)
+        self.assertEqual(self.revalidate(url, response, reader).status_code,
+                         200)
+
+    def test_missing_object(self):
+        """Для несуществующего объекта view отвечает 404 как обычно"""
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.othergroup = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Другое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за созданием,
+        переносом и удалением поста"""
+        post = Post.objects.create(author=self.author, group=self.group,
+                                   text='Тестовый пост')
+        self.assertEqual(self.counters(self.author).posts, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        post.group = self.othergroup
+        post.save()
+        self.group.refresh_from_db()
+        self.othergroup.refresh_from_db()
+        self.assertEqual(self.group.post_count, 0)
+        self.assertEqual(self.othergroup.post_count, 1)
+        post.delete()
+        self.othergroup.refresh_from_db()
+        self.assertEqual(self.othergroup.post_count, 0)
+        self.assertEqual(self.counters(self.author).posts, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок"""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author).followers, 1)
+        self.assertEqual(self.counters(self.reader).following, 1)
+        follow.delete()
+        self.assertEqual(self.counters(self.author).followers, 0)
+        self.assertEqual(self.counters(self.reader).following, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет расхождения"""
+        post = Post.objects.create(author=self.author, group=self.group,
+                                   text='Тестовый пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounters.objects.all().delete()
+        Group.objects.update(post_count=7)
+        Post.objects.update(comment_count=7)
+        call_command('recount', stdout=StringIO())
+        self.group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.counters(self.author).posts, 1)
+        self.assertEqual(self.counters(self.author).followers, 1)
+        self.assertEqual(self.counters(self.reader).following, 1)
+
+    def test_delete_user_with_content(self):
+        """Удаление пользователя с постами и подписками не воскрешает
+        его счётчики"""
+        user = User.objects.create_user(username='Leaving')
+        post = Post.objects.create(author=user, text='Тестовый пост')
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=user, author=self.author)
+        Follow.objects.create(user=self.reader, author=user)
+        pk = user.pk
+        user.delete()
+        self.assertFalse(UserCounters.objects.filter(user_id=pk).exists())
+        self.assertEqual(self.counters(self.author).followers, 0)
+        self.assertEqual(self.counters(self.reader).following, 0)
+
+    def test_profile_without_counters(self):
+        """Профиль без строки счётчиков считает посты запросом COUNT(*)"""
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        UserCounters.objects.filter(user=self.author).delete()
+        cache.clear()
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}),
+            {'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import followgraph, follows
+from ..models import Follow, Post
+from ..timeline import FollowFeedPaginator
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.readers = [User.objects.create_user(username=f'Reader{i}')
+                       for i in range(3)]
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(4)]
+        for reader, count in zip(cls.readers, (3, 1, 0)):
+            for author in cls.authors[:count]:
+                Follow.objects.create(user=reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        followgraph._index = None
+
+    def tearDown(self):
+        followgraph._index = None
+
+    def ids(self, *users):
+        return [user.pk for user in users]
+
+    def test_snapshot_round_trip(self):
+        """Снимок читается без копирования и совпадает с базой"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph')
+            call_command('snapshot_follow_graph', path=path,
+                         stdout=StringIO())
+            shared = followgraph.open_shared(path)
+            self.assertIn(self.readers[0].pk, shared)
+            self.assertNotIn(self.readers[2].pk, shared)
+            self.assertEqual(list(shared.get(self.readers[0].pk)),
+                             self.ids(*self.authors[:3]))
+            self.assertEqual(list(shared.get(self.readers[2].pk)), [])
+            graph = followgraph.FollowIndex(shared, poll=60)
+            graph.sync(force=True)
+            with self.assertNumQueries(0):
+                self.assertTrue(graph.follows(self.readers[1].pk,
+                                              self.authors[0].pk))
+                self.assertFalse(graph.follows(self.readers[1].pk,
+                                               self.authors[1].pk))
+            del graph, shared
+        with self.assertRaises(ValueError):
+            followgraph.SharedIndex(b'\0' * followgraph.HEADER.size)
+
+    def test_lazy_load(self):
+        """Подписки читаются одним запросом при первом обращении"""
+        graph = followgraph.FollowIndex(poll=60)
+        graph.sync(force=True)
+        reader = self.readers[0].pk
+        with self.assertNumQueries(1):
+            self.assertEqual(list(graph.authors(reader)),
+                             self.ids(*self.authors[:3]))
+            self.assertTrue(graph.follows(reader, self.authors[2].pk))
+            self.assertFalse(graph.follows(reader, self.authors[3].pk))
+
+    def test_lru_eviction(self):
+        """Давно не читанные подписки вытесняются по числу id"""
+        graph = followgraph.FollowIndex(max_ids=3, poll=60)
+        graph.sync(force=True)
+        graph.authors(self.readers[0].pk)
+        graph.authors(self.readers[1].pk)
+        self.assertEqual(list(graph.entries), [self.readers[1].pk])
+        self.assertEqual(graph.size, 1)
+
+    def test_own_changes_applied(self):
+        """Подписки этого процесса применяются без чтения базы"""
+        graph = followgraph.FollowIndex(poll=60)
+        graph.sync(force=True)
+        reader, author = self.readers[1], self.authors[3]
+        graph.authors(reader.pk)
+        graph.update(reader.pk, author.pk, True)
+        graph.update(reader.pk, self.authors[0].pk, False)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(graph.authors(reader.pk)), [author.pk])
+        self.assertEqual(graph.size, 1)
+
+    def test_sync_discards_changed_users(self):
+        """Изменения других процессов приходят через outbox"""
+        graph = followgraph.FollowIndex(poll=60)
+        graph.sync(force=True)
+        reader, author = self.readers[2], self.authors[3]
+        self.assertFalse(graph.follows(reader.pk, author.pk))
+        # подписка «в другом процессе»: этот индекс о ней не знает
+        Follow.objects.create(user=reader, author=author)
+        self.assertFalse(graph.follows(reader.pk, author.pk))
+        graph.sync(force=True)
+        self.assertTrue(graph.follows(reader.pk, author.pk))
+
+    @override_settings(OUTBOX_RETENTION=60)
+    def test_reset_after_retention(self):
+        """Индекс, долго не читавший outbox, начинает заново"""
+        graph = followgraph.FollowIndex(poll=60)
+        graph.sync(force=True)
+        graph.authors(self.readers[0].pk)
+        graph.synced = time.time() - 120
+        graph.sync(force=True)
+        self.assertEqual(graph.size, 0)
+        self.assertFalse(graph.entries)
+
+    @override_settings(FOLLOW_INDEX=True, TIMELINE_FANOUT_LIMIT=0)
+    def test_feed_and_follow_set_use_index(self):
+        """С FOLLOW_INDEX лента и проверки подписки идут через индекс"""
+        for author in self.authors:
+            Post.objects.create(author=author, text='Тестовый пост')
+        reader = self.readers[0]
+        paginator = FollowFeedPaginator(reader, 10)
+        self.assertEqual(sorted(paginator.fan_in_authors()),
+                         self.ids(*self.authors[:3]))
+        follow_set = follows.FollowSet(reader)
+        self.assertIn(self.authors[1], follow_set)
+        self.assertNotIn(self.authors[3].pk, follow_set)
+        with self.assertNumQueries(0):
+            self.assertIn(self.authors[0], follows.FollowSet(reader))
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_SET_TIMEOUT=60 * 60)
+class FollowSetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(3)]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.create(author=cls.authors[2],
+                                       text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_membership(self):
+        """Подписки читаются одним запросом, дальше - из кэша"""
+        with self.assertNumQueries(1):
+            follow_set = follows.FollowSet(self.reader)
+            self.assertIn(self.authors[0], follow_set)
+            self.assertIn(self.authors[1].pk, follow_set)
+            self.assertNotIn(self.authors[2], follow_set)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(follows.FollowSet(self.reader)), 2)
+
+    @override_settings(FOLLOW_SET_TIMEOUT=0)
+    def test_local_cache_not_used(self):
+        """Без общего кэша подписки читаются заново в каждом запросе"""
+        # в кэше этого процесса устаревшее множество другого воркера
+        cache.set(follows.cache_key(self.reader.pk), frozenset())
+        with self.assertNumQueries(1):
+            self.assertIn(self.authors[0], follows.FollowSet(self.reader))
+
+    def test_anonymous(self):
+        """У анонима подписок нет, и база не читается"""
+        with self.assertNumQueries(0):
+            self.assertNotIn(self.authors[0],
+                             follows.FollowSet(AnonymousUser()))
+
+    def test_follow_and_unfollow_invalidate(self):
+        """Подписка и отписка сбрасывают закэшированное множество"""
+        author = self.authors[2]
+        self.assertNotIn(author, follows.FollowSet(self.reader))
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': author.username}))
+        self.assertIn(author, follows.FollowSet(self.reader))
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': author.username}))
+        self.assertNotIn(author, follows.FollowSet(self.reader))
+
+    def test_pages_show_follow_state(self):
+        """Профиль и страница поста берут состояние подписки из множества"""
+        response = self.client.get(
+            reverse('posts:profile',
+                    kwargs={'username': self.authors[0].username}))
+        self.assertTrue(response.context['following'])
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(url), 'подписаться на автора')
+        Follow.objects.create(user=self.reader, author=self.authors[2])
+        self.assertContains(self.client.get(url), 'отписаться от автора')
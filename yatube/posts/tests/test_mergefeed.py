@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import mergefeed
+from ..models import Follow, Post
+
+User = get_user_model()
+
+MERGE = 'posts.mergefeed.MergeFeedPaginator'
+
+
+@override_settings(FOLLOW_FEED_AUTHOR_POSTS=3)
+class MergeFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(4)]
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+        now = timezone.now()
+        for i in range(7):
+            for author in cls.authors:
+                Post.objects.create(author=author, text=f'Пост {i}')
+        # у части постов одинаковая дата: порядок решает id
+        for i, post in enumerate(Post.objects.order_by('pk')):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(minutes=i // 3 * 7 % 11))
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        return list(Post.objects.filter(author__following__user=self.reader)
+                                .order_by('-pub_date', '-pk'))
+
+    def walk(self, per_page):
+        paginator = mergefeed.MergeFeedPaginator(self.reader, per_page)
+        pages, page = [], paginator.get_page()
+        while True:
+            pages.append(list(page))
+            if page.next_cursor is None:
+                break
+            page = paginator.get_page(page.next_cursor)
+        backwards = [list(page)]
+        while page.previous_cursor is not None:
+            page = paginator.get_page(page.previous_cursor)
+            backwards.append(list(page))
+        return pages, backwards[::-1]
+
+    def test_pages_match_query(self):
+        """Страницы вперёд и назад совпадают с запросом по подпискам"""
+        feed = self.feed()
+        for per_page in (1, 2, 4, 5, 30):
+            with self.subTest(per_page=per_page):
+                pages, backwards = self.walk(per_page)
+                self.assertEqual(sum(pages, []), feed)
+                self.assertEqual(backwards, pages)
+
+    def test_warm_page_reads_only_its_posts(self):
+        """С прогретыми списками страница - подписки читателя и один
+        in_bulk"""
+        paginator = mergefeed.MergeFeedPaginator(self.reader, 5)
+        first = list(paginator.get_page())
+        with self.assertNumQueries(2):
+            self.assertEqual(list(paginator.get_page()), first)
+        self.assertEqual(first, self.feed()[:5])
+
+    def test_new_post_invalidates_author_list(self):
+        """Новый пост автора сбрасывает его список"""
+        paginator = mergefeed.MergeFeedPaginator(self.reader, 5)
+        paginator.get_page()
+        post = Post.objects.create(author=self.authors[0], text='Новый')
+        self.assertEqual(list(paginator.get_page())[0], post)
+        post.delete()
+        self.assertEqual(list(paginator.get_page()), self.feed()[:5])
+
+    @override_settings(FOLLOW_FEED_PAGINATOR=MERGE)
+    def test_follow_index_view(self):
+        """Лента подписок отдаётся через слияние, если оно включено"""
+        client = Client()
+        client.force_login(self.reader)
+        posts, cursor = [], None
+        while True:
+            response = client.get(reverse('posts:follow_index'),
+                                  {'cursor': cursor} if cursor else {})
+            page_obj = response.context['page_obj']
+            self.assertIsInstance(page_obj.paginator,
+                                  mergefeed.MergeFeedPaginator)
+            posts.extend(page_obj)
+            cursor = page_obj.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(posts, self.feed())
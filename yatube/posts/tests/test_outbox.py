@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import outbox, search
+from ..models import Comment, OutboxCheckpoint, OutboxEvent, Post
+
+User = get_user_model()
+
+
+class OutboxTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def events(self):
+        return list(OutboxEvent.objects.order_by('pk')
+                                       .values_list('kind', 'action'))
+
+    def test_changes_are_recorded(self):
+        """Сохранение и удаление постов и комментариев попадают в outbox"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(post=post, author=self.author,
+                                         text='Комментарий')
+        comment.delete()
+        post.delete()
+        self.assertEqual(self.events(), [
+            (OutboxEvent.POST, OutboxEvent.SAVED),
+            (OutboxEvent.COMMENT, OutboxEvent.SAVED),
+            (OutboxEvent.COMMENT, OutboxEvent.DELETED),
+            (OutboxEvent.POST, OutboxEvent.DELETED),
+        ])
+
+    def test_rolled_back_save_leaves_no_event(self):
+        """Событие живёт в одной транзакции с изменением"""
+        try:
+            with transaction.atomic():
+                Post.objects.create(author=self.author, text='Пост')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(self.events(), [])
+
+    def test_write_does_not_touch_index(self):
+        """Создание поста не обновляет индекс в самом запросе"""
+        with mock.patch.object(search, 'reindex') as reindex:
+            self.client.post(reverse('posts:post_create'),
+                             {'text': 'Новый пост'})
+        reindex.assert_not_called()
+        self.assertEqual(self.events(), [(OutboxEvent.POST,
+                                          OutboxEvent.SAVED)])
+
+    def test_batches_and_checkpoint(self):
+        """События обрабатываются пачками, позиция сохраняется"""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(5)]
+        handler = mock.Mock()
+        with mock.patch.dict(outbox.CONSUMERS,
+                             {'search': {OutboxEvent.POST: handler}},
+                             clear=True):
+            self.assertEqual(outbox.process_batch('search', 2), 2)
+            self.assertEqual(outbox.drain(batch_size=2), 3)
+            self.assertEqual(outbox.drain(), 0)
+            self.assertEqual(outbox.position('search'),
+                             OutboxEvent.objects.latest('pk').pk)
+            self.assertEqual(outbox.prune(), 0)
+            self.assertEqual(outbox.prune(retention=0), 5)
+        self.assertEqual([call.args[0] for call in handler.call_args_list],
+                         [[posts[0].pk, posts[1].pk],
+                          [posts[2].pk, posts[3].pk], [posts[4].pk]])
+
+    def test_failed_batch_is_redelivered(self):
+        """Упавшая пачка доставляется снова (at-least-once)"""
+        post = Post.objects.create(author=self.author, text='Кот')
+        with mock.patch.object(search, 'reindex', side_effect=OSError):
+            with mock.patch.dict(outbox.CONSUMERS,
+                                 {'search': {OutboxEvent.POST:
+                                             search.reindex}}):
+                with self.assertRaises(OSError):
+                    outbox.drain(['search'])
+        self.assertEqual(outbox.position('search'), 0)
+        self.assertEqual(outbox.drain(['search']), 1)
+        self.assertEqual(list(search.SearchResults('коты')[:10]), [post])
+
+    def test_lag(self):
+        """Отставание считается по старейшему необработанному событию"""
+        self.assertEqual(outbox.lag('search'),
+                         {'pending': 0, 'seconds': 0.0})
+        Post.objects.create(author=self.author, text='Пост')
+        OutboxEvent.objects.update(
+            created=OutboxEvent.objects.get().created - timedelta(minutes=1))
+        lag = outbox.lag('search')
+        self.assertEqual(lag['pending'], 1)
+        self.assertGreaterEqual(lag['seconds'], 60)
+
+    def test_lag_in_metrics(self):
+        """Отставание видно в сводке метрик"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        Post.objects.create(author=self.author, text='Пост')
+        summary = self.client.get(reverse('metrics')).json()
+        self.assertEqual(summary['gauges']['outbox_lag']['search']['pending'],
+                         1)
+
+    @override_settings(OUTBOX_RETENTION=0)
+    def test_command(self):
+        """Команда с --once обрабатывает очередь и чистит её"""
+        Post.objects.create(author=self.author, text='Кот')
+        out = StringIO()
+        call_command('drain_outbox', '--once', stdout=out)
+        self.assertIn('search: обработано 1', out.getvalue())
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertTrue(OutboxCheckpoint.objects.filter(
+            consumer='search').exists())
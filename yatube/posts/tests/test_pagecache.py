@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..pagecache import bump, fetch, generation
+
+FEED = ('group', 1)
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+
+    def render(self):
+        self.renders += 1
+        return f'версия {self.renders}'
+
+    def test_fragment_lives_until_generation_bump(self):
+        """Фрагмент перестраивается только после смены поколения"""
+        self.assertEqual(fetch('page', FEED, [1], self.render), 'версия 1')
+        self.assertEqual(fetch('page', FEED, [1], self.render), 'версия 1')
+        bump(FEED)
+        self.assertEqual(fetch('page', FEED, [1], self.render), 'версия 2')
+        self.assertEqual(fetch('page', FEED, [2], self.render), 'версия 3')
+
+    def test_bump_survives_evicted_generation(self):
+        """Поколение растёт, даже если его ключ вытеснен из кэша"""
+        before = generation(FEED)
+        cache.clear()
+        bump(FEED)
+        self.assertGreater(generation(FEED), before)
+
+    def test_stale_fragment_served_while_locked(self):
+        """Пока фрагмент перестраивает другой запрос,
+        отдаётся прежняя версия"""
+        fetch('page', FEED, [1], self.render)
+        bump(FEED)
+
+        def concurrent():
+            return fetch('page', FEED, [1], self.render)
+
+        self.assertEqual(fetch('page', FEED, [1], concurrent), 'версия 1')
+        self.assertEqual(self.renders, 1)
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Follow, Post
+from ..paginators import CachedCountPaginator, CursorPaginator, count_key
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Тестовый пост {i}')
+            for i in range(settings.POSTLIMIT * 2 + 5)
+        )
+        # половина постов с одинаковой датой - проверка ключа по id
+        Post.objects.filter(pk__in=Post.objects.values('pk')[:15]).update(
+            pub_date=timezone.now())
+        cls.expected = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def walk(self, url):
+        posts, cursor = [], None
+        while True:
+            response = self.client.get(url, {'cursor': cursor} if cursor
+                                       else {})
+            page_obj = response.context['page_obj']
+            posts.extend(page_obj)
+            cursor = page_obj.next_cursor
+            if cursor is None:
+                return posts
+
+    def test_cursor_walks_all_posts_in_order(self):
+        """Курсоры обходят ленту целиком, без повторов и пропусков"""
+        for url in (reverse('posts:index'),
+                    reverse('posts:profile',
+                            kwargs={'username': self.author})):
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(url), self.expected)
+
+    def test_previous_cursor(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        paginator = CursorPaginator(Post.objects.all(), settings.POSTLIMIT)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertIsNone(back.previous_cursor)
+        self.assertEqual(back.next_cursor, first.next_cursor)
+
+    def test_page_number_shim(self):
+        """Старые ссылки ?page=N продолжают работать"""
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.expected[settings.POSTLIMIT:settings.POSTLIMIT * 2])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'broken'})
+        self.assertEqual(list(response.context['page_obj']),
+                         self.expected[:settings.POSTLIMIT])
+
+    def test_no_count_query(self):
+        """Страница по курсору не выполняет COUNT(*)"""
+        paginator = CursorPaginator(Post.objects.all(), settings.POSTLIMIT)
+        with self.assertNumQueries(1):
+            list(paginator.page())
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        for i in range(settings.POSTLIMIT * 6):
+            Post.objects.create(author=cls.author, text=f'Тестовый пост {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, {'page': 2})
+        return sum('COUNT(' in query['sql']
+                   for query in context.captured_queries)
+
+    def test_count_is_cached_and_invalidated(self):
+        """Число постов считается один раз и сбрасывается новым постом"""
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        self.assertEqual(self.count_queries(url), 1)
+        self.assertEqual(self.count_queries(url), 0)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertIsNone(cache.get(count_key('author', self.author.pk)))
+        self.assertEqual(self.count_queries(url), 1)
+
+    def test_follow_count_follows_authors_posts(self):
+        """Число постов ленты подписок сбрасывается новым и удалённым
+        постом автора и подпиской"""
+        reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertEqual(self.count_queries(url), 1)
+        self.assertEqual(self.count_queries(url), 0)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.count_queries(url), 1)
+        post.delete()
+        self.assertEqual(self.count_queries(url), 1)
+        other = User.objects.create_user(username='Other')
+        Follow.objects.create(user=reader, author=other)
+        self.assertEqual(self.count_queries(url), 1)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=10)
+    def test_estimate_above_threshold(self):
+        """Для больших лент вместо COUNT(*) используется оценка"""
+        paginator = CachedCountPaginator(
+            Post.objects.all(), settings.POSTLIMIT,
+            cache_key=count_key('index'), estimate=lambda: 1000)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 1000)
+
+    def test_page_links_are_windowed(self):
+        """Ссылки на страницы выводятся окном вокруг текущей"""
+        page = CachedCountPaginator(Post.objects.all(), settings.POSTLIMIT,
+                                    window=1).get_page(3)
+        self.assertEqual(list(page.window), [2, 3, 4])
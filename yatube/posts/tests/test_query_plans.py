@@ -0,0 +1,68 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(30):
+            post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text=f'Тестовый пост {i}')
+        cls.post = post
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            page_obj = response.context.get('page_obj')
+            if page_obj is not None and page_obj.next_cursor:
+                self.client.get(url, {'cursor': page_obj.next_cursor})
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                    for row in cursor.fetchall():
+                        yield query['sql'], row[-1]
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком и не сортируют
+        во временном B-дереве"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            for sql, detail in self.plans(url):
+                with self.subTest(url=url, sql=sql):
+                    self.assertNotIn('TEMP B-TREE', detail)
+                    if detail.startswith('SCAN'):
+                        self.assertIn('USING', detail)
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import ranking
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class RankingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.star = User.objects.create_user(username='Star')
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test-slug',
+                                         description='Тестовое описание')
+        for i in range(3):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'Reader{i}'),
+                author=cls.star)
+        now = timezone.now()
+        cls.old = cls.post(cls.author, now - timedelta(hours=48))
+        cls.discussed = cls.post(cls.author, now - timedelta(hours=30))
+        cls.fresh = cls.post(cls.author, now - timedelta(hours=1))
+        cls.starred = cls.post(cls.star, now - timedelta(hours=20))
+        cls.ancient = cls.post(cls.author, now - timedelta(days=30))
+        for _ in range(5):
+            Comment.objects.create(post=cls.discussed, author=cls.star,
+                                   text='Комментарий')
+
+    @classmethod
+    def post(cls, author, pub_date, group=None):
+        post = Post.objects.create(author=author, text='Пост', group=group)
+        Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+        return post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_features(self):
+        """Сигналы считаются для постов из окна кандидатов"""
+        found = ranking.features()
+        self.assertEqual(found.ids.tolist(), [
+            self.old.pk, self.discussed.pk, self.fresh.pk, self.starred.pk])
+        self.assertEqual(found.comments.tolist(), [0, 5, 0, 0])
+        self.assertEqual(found.followers.tolist(), [0, 0, 0, 3])
+        np.testing.assert_allclose(found.age, [48, 30, 1, 20], atol=0.01)
+
+    def test_signals_change_order(self):
+        """Комментарии и подписчики поднимают пост над более свежим"""
+        recency = ranking.WeightedEngine(weights={'recency': 1.0})
+        weighted = ranking.WeightedEngine(weights={
+            'recency': 1.0, 'velocity': 2.0, 'followers': 1.0})
+        found = ranking.features()
+        self.assertEqual(
+            ranking.top(found.ids, recency.score(found), 10).tolist(),
+            [self.fresh.pk, self.starred.pk, self.discussed.pk, self.old.pk])
+        self.assertEqual(
+            ranking.top(found.ids, weighted.score(found), 2).tolist(),
+            [self.discussed.pk, self.starred.pk])
+
+    def test_group_activity(self):
+        """Активность группы - число её постов среди кандидатов"""
+        for hours in (2, 3):
+            self.post(self.author, timezone.now() - timedelta(hours=hours),
+                      self.group)
+        found = ranking.features()
+        self.assertEqual(found.group_posts.tolist(), [0, 0, 0, 0, 2, 2])
+
+    @override_settings(RANKING_WEIGHTS={'recency': 1.0, 'velocity': 2.0})
+    def test_index_reads_stored_ranking(self):
+        """Главная берёт готовый список, ?sort=new - по дате"""
+        self.assertEqual(ranking.rank(k=3), [
+            self.discussed.pk, self.fresh.pk, self.starred.pk])
+        ranked = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(ranked.context['page_obj']),
+                         [self.discussed, self.fresh, self.starred])
+        newest = self.client.get(reverse('posts:index'), {'sort': 'new'})
+        self.assertEqual(list(newest.context['page_obj'])[:2],
+                         [self.fresh, self.starred])
+
+    @override_settings(POSTLIMIT=2)
+    def test_deleted_posts_not_counted(self):
+        """Удалённые после пересчёта посты не считаются и не укорачивают
+        страницы"""
+        ranking.rank(k=3)
+        Post.objects.filter(pk=self.discussed.pk).delete()
+        response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 2)
+        self.assertEqual(list(page_obj), [self.fresh, self.starred])
+        self.assertFalse(page_obj.has_next())
+
+    def test_index_without_ranking_is_chronological(self):
+        """Пока рейтинг не посчитан, лента идёт по дате"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['sort'], 'new')
+        self.assertEqual(response.context['page_obj'][0], self.fresh)
+
+    @override_settings(POSTLIMIT=2)
+    def test_ranked_pages(self):
+        """Рейтинг листается по номерам страниц"""
+        ids = ranking.rank()
+        second = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual([post.pk for post in second.context['page_obj']],
+                         ids[2:4])
+
+    def test_command(self):
+        """Команда пересчитывает рейтинг"""
+        out = StringIO()
+        call_command('rank_feeds', '--top', '2', stdout=out)
+        self.assertEqual(len(ranking.ranked_ids()), 2)
+        self.assertIn('сохранено 2 постов', out.getvalue())
+
+    @override_settings(RANKING_WEIGHTS={'recency': 1.0, 'velocity': 2.0})
+    def test_new_posts_before_next_run(self):
+        """Посты после пересчёта видны первыми до следующего запуска"""
+        ids = ranking.rank(k=3)
+        newer = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(ranking.ranked_ids(), [newer.pk, *ids])
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0], newer)
+        # после пересчёта пост стоит на своём месте в рейтинге
+        ids = ranking.rank(k=3)
+        self.assertEqual(ranking.ranked_ids(), ids)
+
+    def test_engine_is_abstract(self):
+        """Движок без score не создаётся"""
+        with self.assertRaises(TypeError):
+            ranking.Engine()
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import outbox, recommendations
+from ..models import Follow, Recommendation
+
+User = get_user_model()
+
+
+class RecommendationsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        names = ('me', 'a', 'b', 'c', 'd', 'e', 'peer', 'newbie')
+        cls.users = {name: User.objects.create_user(username=name)
+                     for name in names}
+        for user, author in (('me', 'a'), ('me', 'b'), ('a', 'c'),
+                             ('b', 'c'), ('b', 'd'), ('peer', 'a'),
+                             ('peer', 'e')):
+            Follow.objects.create(user=cls.users[user],
+                                  author=cls.users[author])
+        outbox.drain()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.users['me'])
+
+    def suggested(self, name):
+        return [recommendation.author.username for recommendation
+                in recommendations.for_user(self.users[name])]
+
+    def test_friends_of_friends_and_co_follow(self):
+        """Сначала авторы моих авторов, затем авторы похожих читателей"""
+        graph = recommendations.Graph(
+            Follow.objects.values_list('user', 'author'))
+        candidates, scores = recommendations.best(
+            *graph.suggest(self.users['me'].pk), 10)
+        self.assertEqual(candidates.tolist(), [
+            self.users[name].pk for name in ('c', 'd', 'e')])
+        self.assertEqual(scores.tolist(), [2.0, 1.0, 0.5])
+
+    def test_rebuild(self):
+        """Полный пересчёт сохраняет первые N авторов каждому"""
+        with self.settings(RECOMMENDATIONS_TOP_N=2):
+            recommendations.rebuild()
+            self.assertEqual(self.suggested('me'), ['c', 'd'])
+        self.assertEqual(self.suggested('peer'), ['c', 'b'])
+
+    def test_newcomer_gets_popular_authors(self):
+        """Без подписок предлагаются самые читаемые авторы"""
+        recommendations.rebuild()
+        self.assertEqual(self.suggested('newbie'), ['a', 'c', 'b', 'd', 'e'])
+
+    def test_incremental_update_matches_rebuild(self):
+        """Пересчёт по окрестности совпадает с полным пересчётом"""
+        recommendations.rebuild()
+        expected = {name: self.suggested(name) for name in self.users}
+        Recommendation.objects.all().delete()
+        recommendations.refresh([user.pk for user in self.users.values()])
+        self.assertEqual({name: self.suggested(name)
+                          for name in self.users}, expected)
+
+    def test_follow_and_unfollow_refresh_suggestions(self):
+        """Подписка и отписка обновляют рекомендации через outbox"""
+        recommendations.rebuild()
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': 'c'}))
+        outbox.drain()
+        self.assertEqual(self.suggested('me'), ['d', 'e'])
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': 'c'}))
+        outbox.drain()
+        self.assertEqual(self.suggested('me'), ['c', 'd', 'e'])
+
+    def test_shown_on_pages(self):
+        """Рекомендации видны в профиле и в ленте подписок"""
+        recommendations.rebuild()
+        for url in (reverse('posts:profile', kwargs={'username': 'a'}),
+                    reverse('posts:follow_index')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    [recommendation.author.username for recommendation
+                     in response.context['suggestions']],
+                    ['c', 'd', 'e'])
+                self.assertContains(response, 'Кого почитать')
+
+    def test_command(self):
+        """Команда пересчитывает рекомендации"""
+        out = StringIO()
+        call_command('recommend_follows', '--top', '1', stdout=out)
+        self.assertEqual(self.suggested('me'), ['c'])
+        self.assertIn('Сохранено рекомендаций', out.getvalue())
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import outbox, search
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова приводятся к общей основе"""
+        forms = (
+            ('кот', 'кота', 'котов', 'котами'),
+            ('книга', 'книги', 'книгой', 'книгами'),
+            ('красивый', 'красивая', 'красивейшая', 'красивыми'),
+            ('говорить', 'говорили', 'говорит'),
+        )
+        for words in forms:
+            with self.subTest(words=words):
+                self.assertEqual(len({search.stem(word) for word in words}),
+                                 1)
+
+    def test_tokens(self):
+        """Регистр, «ё» и латиница не мешают поиску"""
+        self.assertEqual(search.tokens('Ёжики и Django 2'),
+                         ['ежик', 'и', 'django', '2'])
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test-slug',
+                                         description='Тестовое описание')
+        cls.cats = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Коты, коты и ещё раз котами полон дом')
+        cls.cat = Post.objects.create(author=cls.author,
+                                      text='Про кота и собаку')
+        cls.dog = Post.objects.create(author=cls.author,
+                                      text='Только собаки')
+        outbox.drain()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def find(self, query, **params):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_ranked_results(self):
+        """Другая форма слова находит пост, частые совпадения выше"""
+        self.assertEqual(self.find('кот'), [self.cats, self.cat])
+        self.assertEqual(self.find('собаками'), [self.dog, self.cat])
+        self.assertEqual(self.find('кошка собака'), [])
+        self.assertEqual(self.find(''), [])
+
+    def test_all_words_required(self):
+        """В выдаче только посты со всеми словами запроса"""
+        self.assertEqual(self.find('коты собаки'), [self.cat])
+
+    @override_settings(POSTLIMIT=2)
+    def test_pagination_keeps_query(self):
+        """Страницы выдачи не теряют запрос"""
+        for i in range(3):
+            Post.objects.create(author=self.author, text=f'Поиск {i}')
+        outbox.drain()
+        response = self.client.get(reverse('posts:search'), {'q': 'поиск'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 3)
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D0%B8%D1%81%D0%BA'
+                                      '&amp;page=2')
+        self.assertEqual(len(self.find('поиск', page=2)), 1)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Обработчик outbox обновляет индекс при правке и удалении"""
+        post = Post.objects.create(author=self.author, text='Старый текст')
+        outbox.drain()
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.find('новые'), [])
+        outbox.drain()
+        self.assertEqual(self.find('старый'), [])
+        self.assertEqual(self.find('новые'), [post])
+        post.delete()
+        outbox.drain()
+        self.assertEqual(self.find('новый'), [])
+
+    def test_rebuild(self):
+        """Перестроенный индекс находит те же посты"""
+        search.rebuild()
+        self.assertEqual(self.find('кот'), [self.cats, self.cat])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по тому же индексу"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаками'})
+        self.assertEqual(set(response.context['cl'].result_list),
+                         {self.cat, self.dog})
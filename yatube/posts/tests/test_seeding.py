@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, Timeline, User
+from ..seeding import Seeder
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class SeederTest(TestCase):
+    def test_seeded_data_is_consistent(self):
+        """Массовая загрузка пересчитывает счётчики и ленты подписок"""
+        Seeder(seed=1).run(users=20, groups=3, posts=200, comments=100,
+                           follows=50)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 50)
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1)
+        user = Follow.objects.first().user
+        self.assertEqual(user.counters.posts, user.posts.count())
+        expected = Post.objects.filter(author__following__user=user)
+        self.assertEqual(
+            set(Timeline.objects.filter(user=user)
+                                .values_list('post', flat=True)),
+            set(expected.values_list('pk', flat=True)))
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый seed даёт тот же граф подписок"""
+        user_ids = list(range(1, 101))
+        self.assertEqual(Seeder(seed=7).follow_edges(500, user_ids),
+                         Seeder(seed=7).follow_edges(500, user_ids))
+        self.assertNotEqual(Seeder(seed=7).follow_edges(500, user_ids),
+                            Seeder(seed=8).follow_edges(500, user_ids))
+
+    def test_follow_graph_is_skewed(self):
+        """Подписчики распределены по степенному закону"""
+        edges = Seeder(seed=1).follow_edges(2000, list(range(1, 201)))
+        followers = sorted(Counter(author for _, author in edges).values(),
+                           reverse=True)
+        self.assertGreater(followers[0], 10 * followers[len(followers) // 2])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_yatube(self):
+        """Команда seed_yatube создаёт данные и картинки"""
+        output = StringIO()
+        call_command('seed_yatube', users=30, groups=2, posts=300,
+                     comments=100, follows=100, images=0.5, stdout=output)
+        self.assertIn('строк/с', output.getvalue())
+        self.assertIn('Загрузка: 532 строк', output.getvalue())
+        self.assertEqual(Post.objects.count(), 300)
+        with_image = Post.objects.exclude(image='')
+        self.assertTrue(100 < with_image.count() < 200)
+        self.assertTrue(os.path.exists(
+            os.path.join(TEMP_MEDIA_ROOT, with_image.first().image.name)))
+        self.assertEqual(search.SearchResults('тестовый').count(), 300)
+
+    def test_seed_without_search(self):
+        """С --no-search поисковый индекс не перестраивается"""
+        output = StringIO()
+        call_command('seed_yatube', users=10, groups=1, posts=50,
+                     comments=0, follows=0, search=False, stdout=output)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(search.SearchResults('тестовый').count(), 0)
+        self.assertNotIn('Поисковый индекс', output.getvalue())
+
+
+class BenchFeedsTest(TestCase):
+    def test_results_are_written(self):
+        """Нагрузочный тест записывает результаты в JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_feeds', users=10, groups=2, posts=50,
+                         comments=10, follows=20, workers=1, requests=2,
+                         output=output, stdout=StringIO())
+            with open(output) as result:
+                report = json.load(result)
+        self.assertEqual(report['database']['post'], 50)
+        for endpoint in ('index', 'follow_index', 'post_create'):
+            with self.subTest(endpoint=endpoint):
+                self.assertEqual(report['endpoints'][endpoint]['errors'], 0)
+                self.assertEqual(
+                    report['endpoints'][endpoint]['requests'], 2)
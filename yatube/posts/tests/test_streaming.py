@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+
+from ..models import Comment, Group, Post
+from ..paginators import CursorPaginator
+
+User = get_user_model()
+
+STREAMED = ('posts:group_list', 'posts:profile', 'posts:post_detail')
+
+
+@override_settings(COMMENTLIMIT=5)
+class StreamingPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(username='TestAuthor')
+        for i in range(16):
+            cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                           text=f'Тестовый пост {i}')
+        for i in range(8):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        self.client = Client()
+
+    def pages(self, url):
+        """Все страницы ленты: отрисованные целиком и потоком."""
+        html = []
+        for streaming in (False, True):
+            cache.clear()
+            views = STREAMED if streaming else ()
+            with override_settings(STREAMING_VIEWS=views):
+                response = self.client.get(url)
+            self.assertEqual(response.streaming, streaming)
+            html.append(b''.join(response.streaming_content).decode()
+                        if streaming else response.content.decode())
+        return html
+
+    def test_streamed_pages_match_rendered(self):
+        """Потоковая страница совпадает с обычной, включая курсоры"""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                rendered, streamed = self.pages(url)
+                self.assertEqual(streamed, rendered)
+                self.assertIn('Тестовый пост', streamed)
+        cursor = CursorPaginator(Post.objects.all(), 10).get_page().next_cursor
+        rendered, streamed = self.pages(f'{urls[0]}?cursor={cursor}')
+        self.assertEqual(streamed, rendered)
+
+    @override_settings(STREAMING_VIEWS=STREAMED, STREAMING_CHUNK_SIZE=3)
+    def test_rows_are_read_while_streaming(self):
+        """Посты читаются в iterator() уже во время отправки ответа"""
+        cache.clear()
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            before = len(context.captured_queries)
+            content = b''.join(response.streaming_content).decode()
+        posts = [query['sql'] for query in context.captured_queries[before:]
+                 if query['sql'].startswith('SELECT "posts_post"')]
+        self.assertEqual(len(posts), 1)
+        self.assertEqual(content.count('<article>'), 10)
+        self.assertIn('cursor=', content)
+
+    @override_settings(STREAMING_VIEWS=STREAMED)
+    def test_csrf_cookie_and_metrics(self):
+        """Потоковая страница выставляет cookie CSRF, а её запросы
+        попадают в метрики"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        metrics.reset()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+            b''.join(response.streaming_content)
+        token = response.cookies[settings.CSRF_COOKIE_NAME].value
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(metrics.last('posts:post_detail').queries,
+                         len(context.captured_queries))
+        response = client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
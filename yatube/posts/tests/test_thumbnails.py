@@ -0,0 +1,170 @@
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .. import thumbnails
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.post = Post.objects.create(
+                author=self.author,
+                text='Тестовый пост',
+                image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                         content_type='image/gif'),
+            )
+        self.schedule = schedule
+
+    def test_saved_image_is_scheduled(self):
+        """Сохранение картинки ставит миниатюры в очередь"""
+        self.schedule.assert_called_once_with(self.post.image.name)
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.post.text = 'Другой текст'
+            self.post.save()
+        schedule.assert_not_called()
+
+    def test_render_does_not_resize(self):
+        """Страница не строит миниатюры, пока их нет в хранилище"""
+        with mock.patch.object(thumbnails.AsyncThumbnailBackend,
+                               'generate') as generate:
+            response = self.client.get(reverse('posts:index'))
+        generate.assert_not_called()
+        self.assertContains(response, self.post.image.url)
+
+    def test_pregenerate_command(self):
+        """Команда готовит обе миниатюры, и страница их использует"""
+        call_command('pregenerate_thumbnails', workers=0, stdout=StringIO())
+        for geometry, options in thumbnails.SIZES:
+            with self.subTest(geometry=geometry):
+                thumbnail = thumbnails.backend.get_thumbnail(
+                    self.post.image, geometry, **options)
+                self.assertNotIsInstance(thumbnail,
+                                         thumbnails.PendingThumbnail)
+                self.assertTrue(default.storage.exists(thumbnail.name))
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_page_prefetches_thumbnails(self):
+        """Миниатюры страницы ищутся одним обращением к хранилищу"""
+        for i in range(3):
+            Post.objects.create(
+                author=self.author,
+                text=f'Пост с картинкой {i}',
+                image=SimpleUploadedFile(f'small{i}.gif', SMALL_GIF,
+                                         content_type='image/gif'),
+            )
+        call_command('pregenerate_thumbnails', workers=0, stdout=StringIO())
+        cache.clear()
+        with mock.patch.object(default.kvstore, 'get') as get:
+            response = self.client.get(reverse('posts:index'))
+        get.assert_not_called()
+        # 4 картинки: 4 обращения к кэшу и 4 запроса против get_many
+        # и одного запроса
+        self.assertEqual(
+            response.context['page_obj'].thumbnail_lookups_saved, 6)
+        self.assertNotContains(response, self.post.image.url)
+        images = [post.image for post in Post.objects.all()]
+        geometry, options = thumbnails.SIZES[0]
+        self.assertEqual(thumbnails.prefetch(images, geometry, **options),
+                         len(images) - 1)
+
+    def test_compact_records(self):
+        """Сведения о миниатюре хранятся компактно"""
+        thumbnails.generate(self.post.image.name)
+        geometry, options = thumbnails.SIZES[0]
+        name = thumbnails.backend.thumbnail_name(self.post.image, geometry,
+                                                 options)
+        thumbnail = ImageFile(name, default.storage)
+        value = KVStoreModel.objects.get(key=add_prefix(thumbnail.key)).value
+        self.assertEqual(value, f'["{name}",100,100]')
+        self.assertEqual(list(default.kvstore.get(thumbnail).size), [100, 100])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ScheduleTest(TransactionTestCase):
+    """Миниатюры после коммита; тестовая база в файле, как в работе"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='TestAuthor')
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.author,
+            text='Тестовый пост',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    def assertGenerated(self, post):
+        for geometry, options in thumbnails.SIZES:
+            with self.subTest(geometry=geometry):
+                thumbnail = thumbnails.backend.get_thumbnail(
+                    post.image, geometry, **options)
+                self.assertNotIsInstance(thumbnail,
+                                         thumbnails.PendingThumbnail)
+                self.assertTrue(default.storage.exists(thumbnail.name))
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_pool_generates_after_commit(self):
+        """Поток пула готовит миниатюры своим соединением с базой"""
+        self.assertFalse(connection.is_in_memory_db())
+        pool = ThreadPoolExecutor(max_workers=2)
+        with mock.patch.object(thumbnails, '_executor', pool):
+            post = self.create_post()
+            pool.shutdown(wait=True)
+        self.assertGenerated(post)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_no_workers_generates_inline(self):
+        """Без потоков миниатюры готовятся сразу после коммита"""
+        with mock.patch.object(thumbnails, 'executor') as executor:
+            post = self.create_post()
+        executor.assert_not_called()
+        self.assertGenerated(post)
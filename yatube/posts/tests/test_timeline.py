@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other = User.objects.create_user(username='OtherReader')
+        cls.authors = [User.objects.create_user(username=f'Author{i}')
+                       for i in range(3)]
+        Follow.objects.create(user=cls.other, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count=4):
+        for i in range(count):
+            for author in self.authors:
+                Post.objects.create(author=author, text=f'Пост {i}')
+
+    def feed(self, user):
+        return list(Post.objects.filter(author__following__user=user)
+                                .order_by('-pub_date', '-pk'))
+
+    def walk(self):
+        posts, cursor = [], None
+        while True:
+            response = self.client.get(reverse('posts:follow_index'),
+                                       {'cursor': cursor} if cursor else {})
+            page_obj = response.context['page_obj']
+            posts.extend(page_obj)
+            cursor = page_obj.next_cursor
+            if cursor is None:
+                return posts
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        post = Post.objects.create(author=self.authors[0], text='Новый')
+        self.assertEqual(
+            set(Timeline.objects.filter(post=post)
+                                .values_list('user', flat=True)),
+            {self.reader.pk, self.other.pk})
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дописывает старые посты, отписка их убирает"""
+        self.create_posts()
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.authors[1]}))
+        self.assertEqual(self.walk(), self.feed(self.reader))
+        self.assertEqual(len(self.walk()), 4)
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.authors[1]}))
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.walk(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_popular_author_read_on_request(self):
+        """Посты популярных авторов читаются при запросе и сливаются
+        с готовой лентой в правильном порядке"""
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+        self.create_posts(count=8)
+        self.assertFalse(
+            Timeline.objects.filter(author=self.authors[0]).exists())
+        self.assertTrue(
+            Timeline.objects.filter(author=self.authors[1]).exists())
+        self.assertEqual(self.walk(), self.feed(self.reader))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_below_limit_fans_out_again(self):
+        """Автор, переставший быть популярным, снова раскладывается по
+        лентам, даже если набор популярных в кэше устарел"""
+        author = self.authors[0]
+        self.create_posts(count=2)
+        Follow.objects.create(user=self.reader, author=author)
+        self.assertFalse(Timeline.objects.filter(author=author).exists())
+        Follow.objects.filter(user=self.reader, author=author).delete()
+        self.assertEqual(
+            Timeline.objects.filter(user=self.other, author=author).count(),
+            2)
+        # другой процесс ещё считает автора популярным
+        cache.set(timeline.CELEBRITIES_KEY, {author.pk})
+        post = Post.objects.create(author=author, text='Новый')
+        self.assertTrue(
+            Timeline.objects.filter(user=self.other, post=post).exists())
@@ -15,7 +15,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class ViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -150,11 +150,24 @@ class ViewsTest(TestCase):
         self.assertNotIn(self.post, response.context['page_obj'])
 
     def test_cache(self):
-        """тест кэширования"""
+        """тест кэширования: лента берётся из кэша,
+        пока в ней не появится или не пропадёт пост"""
+        cache.clear()
         first_response = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.all().delete()
+        Post.objects.update(text='Изменён в обход сигналов')
         second_response = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(first_response.content, second_response.content)
-        cache.clear()
+        Post.objects.all().delete()
         third_response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(second_response.content, third_response.content)
+
+    def test_comment_invalidates_post_cache(self):
+        """Новый комментарий сразу виден на странице поста"""
+        cache.clear()
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.authorized_client.get(url)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Свежий комментарий'})
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Свежий комментарий')
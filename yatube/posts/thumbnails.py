@@ -0,0 +1,194 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import (DummyImageFile, ImageFile,
+                                   deserialize_image_file)
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as DBKVStore
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+# должны совпадать с тегами {% thumbnail %} в шаблонах постов
+SIZES = (
+    ('100x100', {'crop': 'center'}),
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+
+
+class PendingThumbnail(DummyImageFile):
+    """Миниатюра, которая ещё готовится: вместо неё отдаём исходник."""
+
+    def __init__(self, source, geometry_string):
+        super().__init__(geometry_string)
+        self.source = source
+
+    @property
+    def url(self):
+        return self.source.url
+
+
+class KVStore(DBKVStore):
+    """Хранилище сведений о миниатюрах.
+
+    Миниатюры из стандартного хранилища файлов записываются компактно,
+    как ``[имя, ширина, высота]``, а ``get_many`` достаёт сразу пачку
+    записей: одно обращение к кэшу и не больше одного запроса к базе.
+    """
+
+    def _set(self, key, value, identity='image'):
+        if (identity == 'image'
+                and value.serialize_storage()
+                == sorl_settings.THUMBNAIL_STORAGE):
+            self._set_raw(add_prefix(key, identity),
+                          json.dumps([value.name, *value.size],
+                                     separators=(',', ':')))
+            return
+        super()._set(key, value, identity)
+
+    def _get(self, key, identity='image'):
+        if identity == 'image':
+            return self.decode(self._get_raw(add_prefix(key, identity)))
+        return super()._get(key, identity)
+
+    def decode(self, value):
+        if not value:
+            return None
+        if not value.startswith('['):
+            return deserialize_image_file(value)
+        name, width, height = json.loads(value)
+        image_file = ImageFile(name, default.storage)
+        image_file.set_size((width, height))
+        return image_file
+
+    def get_many(self, image_files):
+        return self.fetch_many(image_files)[0]
+
+    def fetch_many(self, image_files):
+        """То же, что get_many, плюс число ключей, которых не было в
+        кэше и за которыми пришлось идти в базу."""
+        keys = [add_prefix(image_file.key) for image_file in image_files]
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            rows = dict(KVStoreModel.objects.filter(key__in=missing)
+                                            .values_list('key', 'value'))
+            loaded = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(loaded, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(loaded)
+        return [None if values[key] is EMPTY_VALUE
+                else self.decode(values[key]) for key in keys], len(missing)
+
+
+class AsyncThumbnailBackend(ThumbnailBackend):
+    """Отдаёт миниатюры только из KV-хранилища.
+
+    Шаблон никогда не ждёт Pillow: если миниатюры ещё нет, подставляется
+    исходное изображение, а сама миниатюра строится в фоне (``schedule``)
+    или командой ``pregenerate_thumbnails``.
+    """
+
+    def full_options(self, source, options):
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_name(self, file_, geometry_string, options):
+        source = ImageFile(file_)
+        return self._get_thumbnail_filename(
+            source, geometry_string, self.full_options(source, options))
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        name = self.thumbnail_name(file_, geometry_string, options)
+        prefetched = getattr(file_, 'prefetched_thumbnails', {})
+        if name in prefetched:
+            cached = prefetched[name]
+        else:
+            cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        return PendingThumbnail(ImageFile(file_), geometry_string)
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+
+backend = AsyncThumbnailBackend()
+
+
+def prefetch(images, geometry_string, **options):
+    """Находит миниатюры всех картинок страницы одним обращением
+    к хранилищу и возвращает число сэкономленных обращений."""
+    images = [image for image in images if image]
+    if not images:
+        return 0
+    names = [backend.thumbnail_name(image, geometry_string, dict(options))
+             for image in images]
+    found, missing = default.kvstore.fetch_many(
+        ImageFile(name, default.storage) for name in names)
+    for image, name, thumbnail in zip(images, names, found):
+        image.__dict__.setdefault('prefetched_thumbnails', {})[name] = (
+            thumbnail)
+    # по одной: обращение к кэшу на картинку и запрос на каждый промах;
+    # пачкой: один get_many и не больше одного запроса
+    single = len(images) + missing
+    batched = 1 + bool(missing)
+    logger.debug('Миниатюры страницы: %s обращений вместо %s',
+                 batched, single)
+    return single - batched
+
+
+def generate(name):
+    if not default_storage.exists(name):
+        return
+    for geometry, options in SIZES:
+        backend.generate(name, geometry, **options)
+
+
+def run(name, close=True):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+    finally:
+        if close:
+            # у потока пула своё соединение с базой
+            connection.close()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def schedule(name):
+    """Готовит миниатюры картинки после коммита: в пуле потоков или,
+    если THUMBNAIL_WORKERS = 0, сразу в текущем потоке."""
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: run(name, close=False))
+        return
+    transaction.on_commit(lambda: executor().submit(run, name))
@@ -0,0 +1,176 @@
+import heapq
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+from core import routers
+
+from . import followgraph
+from .models import Follow, Post, Timeline
+from .paginators import CursorPaginator
+
+CELEBRITIES_KEY = 'timeline:celebrities'
+BATCH_SIZE = 500
+
+
+def celebrities():
+    """Авторы, чьи посты не раскладываются по лентам подписчиков."""
+    authors = cache.get(CELEBRITIES_KEY)
+    if authors is None:
+        with routers.primary():
+            authors = set(
+                Follow.objects.values('author')
+                              .annotate(followers=Count('user'))
+                              .filter(followers__gte=settings
+                                      .TIMELINE_FANOUT_LIMIT)
+                              .values_list('author', flat=True))
+        # в других процессах набор обновится не позже чем через
+        # TIMELINE_CELEBRITIES_TTL; запись решает по базе, is_celebrity()
+        cache.set(CELEBRITIES_KEY, authors,
+                  settings.TIMELINE_CELEBRITIES_TTL)
+    return authors
+
+
+def is_celebrity(author_id):
+    """Точная проверка по базе; подписчиков читается не больше порога."""
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    return limit <= 0 or (Follow.objects.filter(author_id=author_id)
+                                        .values('pk')[limit - 1:limit]
+                                        .exists())
+
+
+def add_posts(user_id, author_id, posts):
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post_id=pk, author_id=author_id,
+                  pub_date=pub_date) for pk, pub_date in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    if is_celebrity(post.author_id):
+        return
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                               .values_list('user', flat=True))
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post_id=post.pk,
+                  author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    posts = (Post.objects.filter(author_id=author_id)
+                         .values_list('pk', 'pub_date'))
+    add_posts(user_id, author_id, posts.iterator())
+
+
+def prune(user_id, author_id):
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Заново раскладывает все посты по лентам одним INSERT ... SELECT,
+    например после массовой загрузки данных в обход сигналов."""
+    cache.delete(CELEBRITIES_KEY)
+    Timeline.objects.all().delete()
+    timeline, post, follow = (model._meta.db_table
+                              for model in (Timeline, Post, Follow))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {timeline} (user_id, post_id, author_id, pub_date) '
+            f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {follow} f JOIN {post} p ON p.author_id = f.author_id '
+            f'WHERE f.author_id NOT IN (SELECT author_id FROM {follow} '
+            f'GROUP BY author_id HAVING COUNT(*) >= %s)',
+            [settings.TIMELINE_FANOUT_LIMIT])
+
+
+def follow_added(follow):
+    if not is_celebrity(follow.author_id):
+        backfill(follow.user_id, follow.author_id)
+    elif Timeline.objects.filter(author_id=follow.author_id).delete()[0]:
+        # автор стал слишком популярным - читаем его посты при запросе
+        cache.delete(CELEBRITIES_KEY)
+
+
+def follow_removed(follow):
+    prune(follow.user_id, follow.author_id)
+    author_id = follow.author_id
+    if is_celebrity(author_id):
+        return
+    # у популярного автора строк в лентах нет: если посты есть, а строк
+    # нет, он только что перестал быть популярным - раскладываем заново
+    followers = Follow.objects.filter(author_id=author_id)
+    if (followers.exists() and Post.objects.filter(author_id=author_id)
+            .exists()
+            and not Timeline.objects.filter(author_id=author_id).exists()):
+        cache.delete(CELEBRITIES_KEY)
+        for user_id in followers.values_list('user', flat=True):
+            backfill(user_id, author_id)
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """Лента подписок: готовая лента из Timeline плюс посты популярных
+    авторов, которые дочитываются при запросе и сливаются по ключу."""
+
+    def __init__(self, user, per_page):
+        super().__init__(
+            Timeline.objects.filter(user=user)
+                            .select_related('post__author', 'post__group')
+                            .order_by('-pub_date', '-post_id'),
+            per_page,
+        )
+        self.user = user
+
+    def fan_in_authors(self):
+        authors = celebrities()
+        if not authors:
+            return []
+        if settings.FOLLOW_INDEX:
+            graph = followgraph.index()
+            return [author_id for author_id in authors
+                    if graph.follows(self.user.pk, author_id)]
+        return list(Follow.objects.filter(user=self.user, author__in=authors)
+                                  .values_list('author', flat=True))
+
+    def page(self, cursor=None):
+        position, backwards = None, False
+        if cursor is not None:
+            position, backwards = self.decode_cursor(cursor)
+        limit = self.per_page + 1
+        authors = self.fan_in_authors()
+        entries = self.object_list
+        if authors:
+            entries = entries.exclude(author__in=authors)
+        entries = self.slice(entries, position, backwards,
+                             key=('pub_date', 'post_id'))
+        rows = [entry.post for entry in entries[:limit]]
+        if authors:
+            posts = self.slice(
+                Post.objects.filter(author__in=authors)
+                            .select_related('group', 'author'),
+                position, backwards)
+            rows = list(islice(
+                heapq.merge(rows, posts[:limit],
+                            key=attrgetter('pub_date', 'pk'),
+                            reverse=self.descending != backwards),
+                limit))
+        return self.build_page(rows, cursor, position, backwards)
+
+    def stream_page(self, cursor=None, chunk_size=None):
+        # страница сливается из двух источников, поэтому читается целиком
+        return self.get_page(cursor)
+
+
+def feed_paginator(user, per_page):
+    """Пагинатор ленты подписок из FOLLOW_FEED_PAGINATOR."""
+    return import_string(settings.FOLLOW_FEED_PAGINATOR)(user, per_page)
@@ -1,70 +1,181 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
 
+from core.streaming import stream
+
+from . import follows, pagecache, ranking, recommendations
+from .conditional import (conditional, group_state, index_state, post_state,
+                          profile_state)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User, UserCounters
+from .paginators import CachedCountPaginator, CursorPaginator, count_key
+from .search import SearchResults
+from .timeline import feed_paginator
+
+
+def streamed(request):
+    return request.resolver_match.view_name in settings.STREAMING_VIEWS
+
+
+def respond(request, template_name, context):
+    """render() или, для страниц из STREAMING_VIEWS, потоковый ответ."""
+    if streamed(request):
+        return stream(request, template_name, context)
+    return render(request, template_name, context)
 
 
-def paginator(dbobject, page, limit=settings.POSTLIMIT):
-    return Paginator(dbobject, limit).get_page(page)
+def paginator(dbobject, request, limit=settings.POSTLIMIT, keyset=None,
+              cache_key=None, estimate=None):
+    if keyset is None:
+        keyset = CursorPaginator(dbobject, limit)
+    page = request.GET.get('page')
+    if page is not None and 'cursor' not in request.GET:
+        return CachedCountPaginator(
+            keyset.slice(dbobject), limit,
+            cache_key=cache_key, estimate=estimate,
+        ).get_page(page)
+    if streamed(request):
+        return keyset.stream_page(request.GET.get('cursor'))
+    return keyset.get_page(request.GET.get('cursor'))
 
 
+def comment_paginator(post_id):
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTLIMIT, key=('created', 'pk'), descending=False,
+    )
+
+
+@conditional(index_state)
 def index(request):
     posts = (Post.objects
                  .select_related(
                      'group', 'author'
                  ))
-    page_obj = paginator(posts, request.GET.get('page'))
+    newest = request.GET.get('sort') == 'new'
+    # готовый рейтинг, пока не попросили свежие или не листают по курсору
+    ids = None
+    if not newest and 'cursor' not in request.GET:
+        ids = ranking.ranked_ids()
+    if ids:
+        page_obj = CachedCountPaginator(
+            ranking.RankedPosts(ids, posts), settings.POSTLIMIT,
+        ).get_page(request.GET.get('page'))
+    else:
+        page_obj = paginator(
+            posts, request,
+            cache_key=count_key('index'),
+            estimate=lambda: Post.objects.aggregate(
+                total=Max('pk'))['total'])
     context = {
         'page_obj': page_obj,
+        'feed': ('index',),
+        'sort': 'top' if ids else 'new',
+        'page_query': 'sort=new' if newest else '',
     }
-    return render(request, 'posts/index.html', context)
+    return respond(request, 'posts/index.html', context)
 
 
+@conditional(group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = (group.posts
                   .select_related(
                       'author'
                   ))
-    page_obj = paginator(posts, request.GET.get('page'))
+    page_obj = paginator(
+        posts, request,
+        cache_key=count_key('group', group.pk),
+        estimate=lambda: group.post_count)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed': ('group', group.pk),
     }
-    return render(request, 'posts/group_list.html', context)
+    return respond(request, 'posts/group_list.html', context)
+
+
+def posts_estimate(author):
+    """Денормализованный счётчик постов автора; без строки счётчиков
+    (до recount) - None, и пагинатор считает COUNT(*)."""
+    try:
+        return author.counters.posts
+    except UserCounters.DoesNotExist:
+        return None
 
 
+@conditional(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User.objects.select_related('counters'),
+                               username=username)
     posts = (author.posts
                    .select_related(
                        'group'
                    ))
-    following = (request.user.is_authenticated
-                 and author.following.filter(user=request.user).exists())
-    page_obj = paginator(posts, request.GET.get('page'))
+    following = author in follows.for_request(request)
+    page_obj = paginator(
+        posts, request,
+        cache_key=count_key('author', author.pk),
+        estimate=lambda: posts_estimate(author))
     context = {
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        'feed': ('author', author.pk),
+        'suggestions': recommendations.for_user(request.user),
     }
-    return render(request, 'posts/profile.html', context)
+    return respond(request, 'posts/profile.html', context)
 
 
+@conditional(post_state)
 def post_detail(request, post_id):
     post = get_object_or_404(Post.objects
                                  .select_related(
-                                     'group', 'author'
+                                     'group', 'author__counters'
                                  ), pk=post_id)
+    comments = comment_paginator(post.pk)
+    # в ключ кэша фрагментов попадают только настоящие курсоры
+    cursor = comments.clean_cursor(request.GET.get('comments'))
+    page = comments.stream_page if streamed(request) else comments.get_page
     context = {
         'post': post,
         'form': CommentForm(),
-        'comments': post.comments.select_related('author'),
+        # страница строится, только если её нет в кэше фрагментов
+        'comments': SimpleLazyObject(lambda: page(cursor)),
+        'comments_cursor': cursor,
+        'feed': ('post', post.pk),
+    }
+    return respond(request, 'posts/post_detail.html', context)
+
+
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page = comment_paginator(post_id).get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'html': render_to_string('posts/includes/comments.html',
+                                 {'comments': page}, request),
+        'next_cursor': page.next_cursor,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = CachedCountPaginator(
+        SearchResults(query), settings.POSTLIMIT,
+    ).get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}),
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(request, 'posts/search.html', context)
 
 
 @login_required
@@ -73,7 +184,9 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        # событие outbox фиксируется вместе с постом
+        with transaction.atomic():
+            post.save()
         return redirect('posts:profile', request.user)
     context = {
         'form': form,
@@ -94,7 +207,8 @@ def post_edit(request, post_id):
         files=request.FILES or None,
         instance=article)
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -110,7 +224,8 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -118,11 +233,23 @@ def add_comment(request, post_id):
 def follow_index(request):
     posts = (Post.objects.filter(author__following__user=request.user)
                          .select_related('group', 'author'))
-    page_obj = paginator(posts, request.GET.get('page'))
+    followed = UserCounters.objects.filter(user__following__user=request.user)
+    cache_key = None
+    if 'page' in request.GET:
+        # число постов сбрасывается постом любого из авторов и подпиской
+        cache_key = count_key('follow', request.user.pk, pagecache.version(
+            [('author', author_id)
+             for author_id in sorted(follows.for_request(request))]))
+    page_obj = paginator(
+        posts, request,
+        keyset=feed_paginator(request.user, settings.POSTLIMIT),
+        cache_key=cache_key,
+        estimate=lambda: followed.aggregate(total=Sum('posts'))['total'])
     context = {
         'page_obj': page_obj,
+        'suggestions': recommendations.for_user(request.user),
     }
-    return render(request, 'posts/follow.html', context)
+    return respond(request, 'posts/follow.html', context)
 
 
 @login_required
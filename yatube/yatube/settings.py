@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,7 +66,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,15 +76,29 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.follows',
             ],
         },
     },
 ]
 
-CACHES = {
-    'default': {
+# local - своя копия кэша в каждом процессе (разработка и тесты),
+# shared - файл SQLite, общий для всех воркеров gunicorn на хосте.
+CACHE_BACKENDS = {
+    'local': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MMAP_SIZE': 256 * 1024 * 1024,
+        },
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('YATUBE_CACHE', 'local')],
 }
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
@@ -92,10 +109,25 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.getenv('YATUBE_DB',
+                          os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': 60,
+        # тестовая база тоже в файле: в базе в памяти с общим кэшем
+        # блокировки таблиц не ждут busy_timeout, и потоки миниатюр
+        # роняли бы запросы с «database table is locked»
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
     }
 }
+if os.getenv('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.getenv('YATUBE_REPLICA_DB'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
 
 
 # Password validation
@@ -138,6 +170,87 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 STATIC_URL = '/static/'
 POSTLIMIT = 10
+COMMENTLIMIT = 20
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_CELEBRITIES_TTL = 60
+PAGINATOR_COUNT_TTL = 5 * 60
+PAGINATOR_ESTIMATE_THRESHOLD = 10000
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_CACHE_REFRESH = 5 * 60
+FEED_CACHE_LOCK_TIMEOUT = 5
+# множество подписок кэшируется, только если кэш общий для воркеров:
+# соседний процесс с LocMem не узнал бы о подписке
+FOLLOW_SET_TIMEOUT = (60 * 60 if CACHES['default'] is CACHE_BACKENDS['shared']
+                      else 0)
+THUMBNAIL_BACKEND = 'posts.thumbnails.AsyncThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_KVSTORE = 'posts.thumbnails.KVStore'
+METRICS_WINDOW = 1000
+
+# страницы, которые можно читать с реплики, и сколько секунд после записи
+# пользователь читает с основной базы
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'api:posts',
+    'api:post',
+    'api:comments',
+    'api:groups',
+    'api:group',
+)
+REPLICA_STICKY_SECONDS = 10
+
+# страницы, которые отдаются StreamingHttpResponse по мере отрисовки,
+# и сколько строк ленты читается из базы за раз
+STREAMING_VIEWS = ()
+STREAMING_CHUNK_SIZE = 100
+
+# ранжирование главной ленты: движок, веса сигналов и окна в часах
+RANKING_ENGINE = 'posts.ranking.WeightedEngine'
+RANKING_WEIGHTS = {
+    'recency': 1.0,
+    'velocity': 0.6,
+    'followers': 0.3,
+    'group': 0.2,
+}
+RANKING_HALF_LIFE = 24
+RANKING_VELOCITY_WINDOW = 6
+RANKING_CANDIDATE_WINDOW = 14 * 24
+RANKING_TOP_K = 200
+
+# «кого читать»: сколько авторов предлагать и веса друзей друзей
+# и похожих по подпискам читателей
+RECOMMENDATIONS_TOP_N = 5
+RECOMMENDATION_WEIGHTS = {
+    'friends_of_friends': 1.0,
+    'co_follow': 1.0,
+}
+
+# JSON API: размер страницы по умолчанию и наибольший по ?limit=
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_POLL_INTERVAL = 1.0
+# сколько секунд хранить обработанные события для индексов в воркерах
+OUTBOX_RETENTION = 10 * 60
+
+# граф подписок в памяти воркера: сколько id подписок держать, как часто
+# читать чужие изменения из outbox и снимок для общего mmap
+FOLLOW_INDEX = False
+FOLLOW_INDEX_MAX_IDS = 1000000
+FOLLOW_INDEX_POLL = 5
+FOLLOW_INDEX_SNAPSHOT = os.environ.get('YATUBE_FOLLOW_INDEX')
+
+# лента подписок: раскладка по Timeline (posts.timeline.FollowFeedPaginator)
+# или слияние списков последних постов авторов (posts.mergefeed
+# .MergeFeedPaginator), длина такого списка и время его жизни в кэше
+FOLLOW_FEED_PAGINATOR = 'posts.timeline.FollowFeedPaginator'
+FOLLOW_FEED_AUTHOR_POSTS = 50
+FOLLOW_FEED_TIMEOUT = 24 * 60 * 60
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 LOGIN_URL = 'users:login'